@@ -0,0 +1,2 @@
+# pytest puts the directory of this file, the repository root, on sys.path,
+# so tests import the plugins as `plugins.<game>`, as `python -m plugins.<game>.fetch` does
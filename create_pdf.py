@@ -2,7 +2,7 @@ import os
 import re
 
 import click
-from utilities import CardSize, PaperSize, CardOrientation, generate_pdf
+from utilities import CardSize, PaperSize, CardOrientation, ImageFormat, generate_pdf
 
 front_directory = os.path.join('game', 'front')
 back_directory = os.path.join('game', 'back')
@@ -16,7 +16,9 @@ default_output_path = os.path.join(output_directory, 'game.pdf')
 @click.option("--back_dir_path", default=back_directory, show_default=True, help="The path to the directory containing one or more card backs.")
 @click.option("--double_sided_dir_path", default=double_sided_directory, show_default=True, help="The path to the directory containing card backs for double-sided cards.")
 @click.option("--output_path", default=default_output_path, show_default=True, help="The desired path to the output PDF.")
+@click.option("--output", "outputs", multiple=True, help="Create several outputs in one run, composed once and downsampled as needed. Format: path[@ppi][:format]. Overrides --output_path and --output_images. Examples: game.pdf@600, proof.pdf@100, previews/@72:jpeg.")
 @click.option("--output_images", default=False, is_flag=True, help="Create images instead of a PDF.")
+@click.option("--image_format", default=ImageFormat.PNG.value, type=click.Choice([t.value for t in ImageFormat], case_sensitive=False), show_default=True, help="The desired image format when using --output_images.")
 @click.option("--card_size", default=CardSize.STANDARD.value, type=click.Choice([t.value for t in CardSize], case_sensitive=False), show_default=True, help="The desired card size.")
 @click.option("--card_width", help="The desired card width when --card_size custom. Examples: 100mm, 4in")
 @click.option("--card_height", help="The desired card height when --card_size custom. Examples: 100mm, 4.7in")
@@ -36,6 +38,10 @@ default_output_path = os.path.join(output_directory, 'game.pdf')
 @click.option("--load_offset", default=False, is_flag=True, help="Apply saved offsets. See `offset_pdf.py` for more information.")
 @click.option("--skip", type=click.IntRange(min=0), multiple=True, help="Skip a card based on its index. Useful for registration issues. Examples: 0, 4.")
 @click.option("--name", help="Label each page of the PDF with a name.")
+@click.option("--sheets", "sheet_string", help="Only render the given sheets, keeping their original sheet numbers. Useful for reprints. Examples: 3, 3,7-9.")
+@click.option("--cards", "card_filenames", multiple=True, help="Only render the sheets containing the given card images. Use this option multiple times to select multiple cards. Examples: 1Island1.png.")
+@click.option("--manifest", "manifest_path", type=click.Path(exists=True, dir_okay=False), help="Lay out the cards listed in a deck manifest written by a plugin, instead of the images in the front and double-sided directories.")
+@click.option("--plan", default=False, is_flag=True, help="Only report the sheets, card assignment, source resolution, peak memory and render time that the run would produce, without rendering.")
 @click.option("--dxf", default=False, is_flag=True, help="Generate .dxf file for SS Studio. Enabled by default for custom paper size.")
 @click.version_option("1.4.0")
 
@@ -45,6 +51,7 @@ def cli(
     double_sided_dir_path,
     output_path,
     output_images,
+    image_format,
     card_size,
     card_width,
     card_height,
@@ -64,7 +71,12 @@ def cli(
     skip,
     load_offset,
     name,
-    dxf
+    dxf,
+    outputs,
+    sheet_string,
+    card_filenames,
+    plan,
+    manifest_path
 ):
     generate_pdf(
         front_dir_path,
@@ -72,6 +84,7 @@ def cli(
         double_sided_dir_path,
         output_path,
         output_images,
+        image_format,
         card_size,
         card_width,
         card_height,
@@ -91,7 +104,12 @@ def cli(
         skip,
         load_offset,
         name,
-        dxf
+        dxf,
+        outputs,
+        sheet_string,
+        card_filenames,
+        plan,
+        manifest_path
     )
 
 if __name__ == '__main__':
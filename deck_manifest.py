@@ -0,0 +1,44 @@
+import os
+from typing import List
+
+from pydantic import BaseModel, Field, ValidationError
+
+MANIFEST_VERSION = 1
+
+class ManifestCard(BaseModel):
+    # Image paths are relative to the directory containing the manifest
+    front: str
+    # Back face of a double-sided card
+    back: str | None = None
+    quantity: int = Field(default=1, ge=1)
+
+class DeckManifest(BaseModel):
+    version: int = MANIFEST_VERSION
+    name: str | None = None
+    # False when the fetch that wrote the manifest failed for some of the cards
+    complete: bool = True
+    # Cards are laid out in this order, single-sided cards before double-sided cards
+    cards: List[ManifestCard] = []
+
+def load_deck_manifest(manifest_path: str) -> DeckManifest:
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = DeckManifest.model_validate_json(f.read())
+    except OSError as e:
+        raise Exception(f'Cannot read deck manifest "{manifest_path}": {e}.')
+    except ValidationError as e:
+        raise Exception(f'Cannot parse deck manifest "{manifest_path}": {e}.')
+
+    if manifest.version > MANIFEST_VERSION:
+        raise Exception(f'Deck manifest "{manifest_path}" has version {manifest.version}, but only versions up to {MANIFEST_VERSION} are supported.')
+
+    if not manifest.complete:
+        raise Exception(f'Deck manifest "{manifest_path}" is incomplete because some cards failed to fetch. Fetch the deck again, for example with --resume, before creating the PDF.')
+
+    return manifest
+
+def save_deck_manifest(manifest: DeckManifest, manifest_path: str) -> None:
+    os.makedirs(os.path.dirname(manifest_path) or '.', exist_ok=True)
+
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        f.write(manifest.model_dump_json(indent=4, exclude_none=True))
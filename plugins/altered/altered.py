@@ -1,14 +1,11 @@
 from os import path
-from requests import Response, get
-from time import sleep
+from requests import Response
+from plugins.common.cache import request_json
+from plugins.common.http import request_get
+from plugins.common.library import request_card_art, save_card_art
 
-def request_altered(query: str) -> Response:
-    r = get(query, headers = {'user-agent': 'silhouette-card-maker/0.1', 'accept': '*/*'})
-
-    r.raise_for_status()
-    sleep(0.15)
-
-    return r
+def request_altered(query: str, **kwargs) -> Response:
+    return request_get(query, **kwargs)
 
 def fetch_card(
     index: int,
@@ -17,14 +14,11 @@ def fetch_card(
     front_img_dir: str,
 ):
     # Query for card info
-    json = request_altered(f'https://api.altered.gg/cards/{qr}').json()
-    card_art = request_altered(json.get('imagePath')).content
-
-    for counter in range(quantity):
-        image_path = path.join(front_img_dir, f'{str(index)}{qr}{str(counter + 1)}.png')
+    json = request_json(f'https://api.altered.gg/cards/{qr}')
+    card_art_path = request_card_art('altered', json.get('imagePath'), request_altered)
 
-        with open(image_path, 'wb') as f:
-            f.write(card_art)
+    image_paths = [path.join(front_img_dir, f'{str(index)}{qr}{str(counter + 1)}.png') for counter in range(quantity)]
+    save_card_art(card_art_path, image_paths)
 
 def get_handle_card(
     front_img_dir: str,
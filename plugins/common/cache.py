@@ -0,0 +1,166 @@
+import os
+import time
+from hashlib import sha256
+from threading import Lock, get_ident
+from typing import Any, Callable, Dict, Optional
+
+from pydantic import BaseModel
+
+from .http import request_get
+
+DEFAULT_CACHE_DIR = os.path.join('game', 'cache', 'http')
+DEFAULT_CACHE_TTL_HOURS = 24
+
+class CacheEntry(BaseModel):
+    url: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float
+    body: Any
+
+class CacheSettings(BaseModel):
+    enabled: bool = True
+    directory: str = DEFAULT_CACHE_DIR
+    ttl_seconds: float = DEFAULT_CACHE_TTL_HOURS * 60 * 60
+
+cache_settings = CacheSettings()
+
+# Values already looked up in this run, so that a card listed on several
+# lines of a deck is only looked up once. Callers must not modify them.
+memo: Dict[str, Any] = {}
+memo_locks: Dict[str, Lock] = {}
+memo_lock = Lock()
+
+def configure_cache(enabled: bool = True, ttl_hours: float = DEFAULT_CACHE_TTL_HOURS, directory: str = DEFAULT_CACHE_DIR) -> None:
+    global cache_settings
+    cache_settings = CacheSettings(enabled=enabled, directory=directory, ttl_seconds=ttl_hours * 60 * 60)
+
+    with memo_lock:
+        memo.clear()
+        memo_locks.clear()
+
+def is_cache_enabled() -> bool:
+    return cache_settings.enabled
+
+def memoized(key: str, fetch: Callable[[], Any]) -> Any:
+    """
+    Returns the value for a key, calling `fetch` at most once per run.
+
+    Concurrent callers with the same key wait for the first one instead of
+    sending the same requests. Failures are not remembered, so later callers
+    try again.
+    """
+    with memo_lock:
+        if key not in memo_locks:
+            memo_locks[key] = Lock()
+
+        key_lock = memo_locks[key]
+
+    with key_lock:
+        if key not in memo:
+            memo[key] = fetch()
+
+        return memo[key]
+
+def get_cache_path(url: str) -> str:
+    return os.path.join(cache_settings.directory, f'{sha256(url.encode("utf-8")).hexdigest()}.json')
+
+def read_cache_entry(url: str) -> Optional[CacheEntry]:
+    try:
+        with open(get_cache_path(url), 'r', encoding='utf-8') as f:
+            entry = CacheEntry.model_validate_json(f.read())
+    except (OSError, ValueError):
+        return None
+
+    # Guard against hash collisions and hand-edited files
+    if entry.url != url:
+        return None
+
+    return entry
+
+def write_cache_entry(entry: CacheEntry) -> None:
+    os.makedirs(cache_settings.directory, exist_ok=True)
+
+    # Write to a temporary file first so concurrent readers never see a partial entry
+    cache_path = get_cache_path(entry.url)
+    temp_path = f'{cache_path}.{os.getpid()}.{get_ident()}.tmp'
+
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(entry.model_dump_json())
+
+    os.replace(temp_path, cache_path)
+
+def request_json(query: str) -> Any:
+    """
+    Fetches a JSON response through the on-disk metadata cache.
+
+    Entries younger than the TTL are served without touching the network.
+    Older entries are revalidated with their ETag or Last-Modified date, so an
+    unchanged response only costs a 304. Each url is only fetched once per run.
+    """
+    return memoized(query, lambda: fetch_json(query))
+
+def fetch_json(query: str) -> Any:
+    if not cache_settings.enabled:
+        return request_get(query).json()
+
+    entry = read_cache_entry(query)
+    now = time.time()
+
+    if entry is not None and now - entry.fetched_at < cache_settings.ttl_seconds:
+        return entry.body
+
+    headers = {}
+    if entry is not None:
+        if entry.etag is not None:
+            headers['if-none-match'] = entry.etag
+        if entry.last_modified is not None:
+            headers['if-modified-since'] = entry.last_modified
+
+    r = request_get(query, headers=headers)
+
+    if r.status_code == 304 and entry is not None:
+        entry.fetched_at = now
+    else:
+        entry = CacheEntry(
+            url=query,
+            etag=r.headers.get('etag'),
+            last_modified=r.headers.get('last-modified'),
+            fetched_at=now,
+            body=r.json(),
+        )
+
+    try:
+        write_cache_entry(entry)
+    except OSError as e:
+        print(f'Could not write cache entry for {query}: {e}')
+
+    return entry.body
+
+def cached(key: str, fetch: Callable[[], Any]) -> Any:
+    """
+    Caches a value built from several requests, such as every page of a search.
+
+    The value is rebuilt with `fetch` once it is older than the TTL. Use a key
+    that cannot be mistaken for a url.
+    """
+    return memoized(key, lambda: fetch_cached(key, fetch))
+
+def fetch_cached(key: str, fetch: Callable[[], Any]) -> Any:
+    if not cache_settings.enabled:
+        return fetch()
+
+    entry = read_cache_entry(key)
+    now = time.time()
+
+    if entry is not None and now - entry.fetched_at < cache_settings.ttl_seconds:
+        return entry.body
+
+    entry = CacheEntry(url=key, fetched_at=now, body=fetch())
+
+    try:
+        write_cache_entry(entry)
+    except OSError as e:
+        print(f'Could not write cache entry for {key}: {e}')
+
+    return entry.body
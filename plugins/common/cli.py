@@ -0,0 +1,167 @@
+import os
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Collection, Dict, Optional, Tuple
+
+from click import BadParameter, Choice, ClickException, FloatRange, IntRange, option, Path as click_path
+from pydantic import BaseModel
+
+from .cache import DEFAULT_CACHE_TTL_HOURS, configure_cache
+from .engine import DEFAULT_CONNECTIONS, close_engine, configure_engine
+from .executor import DEFAULT_WORKERS
+from .http import DEFAULT_TIMEOUT, configure_http
+from .journal import configure_journal, set_journal_options
+from .library import DEFAULT_LIBRARY_DIR, DEFAULT_LIBRARY_SIZE_MB, CopyMode, configure_library, evict_library
+from .manifest import configure_manifest, mark_manifest_incomplete, write_manifest
+from .rate_limit import set_rate_limit
+from .retry import DEFAULT_RETRIES
+from .renditions import DEFAULT_CARD_SIZE, DEFAULT_PPI, configure_renditions, load_card_sizes
+
+DEFAULT_FRONT_DIR = os.path.join('game', 'front')
+DEFAULT_DOUBLE_SIDED_DIR = os.path.join('game', 'double_sided')
+
+class FetchSettings(BaseModel):
+    front_dir: str = DEFAULT_FRONT_DIR
+    double_sided_dir: str = DEFAULT_DOUBLE_SIDED_DIR
+    workers: int = DEFAULT_WORKERS
+    rate_limits: Dict[str, float] = {}
+    timeout: float = DEFAULT_TIMEOUT
+    retries: int = DEFAULT_RETRIES
+    cache_ttl: float = DEFAULT_CACHE_TTL_HOURS
+    no_cache: bool = False
+    library_dir: str = DEFAULT_LIBRARY_DIR
+    library_size: float = DEFAULT_LIBRARY_SIZE_MB
+    copy_mode: CopyMode = CopyMode.COPY
+    manifest: Optional[str] = None
+    resume: bool = False
+    use_async: bool = False
+    connections: int = DEFAULT_CONNECTIONS
+    card_size: str = DEFAULT_CARD_SIZE
+    ppi: int = DEFAULT_PPI
+
+# Settings that change the files written for a card, so a resumed run must match them
+JOURNALED_SETTINGS = ('front_dir', 'double_sided_dir', 'manifest', 'card_size', 'ppi')
+
+def set_deck_options(params: Dict[str, Any], settings: FetchSettings, exclude: Collection[str] = ()) -> None:
+    """
+    Journals the cards that follow under a deck's own arguments and options, for --resume.
+
+    Settings named in `exclude` are not used by the plugin, so they are left
+    out and changing them does not stop a run from being resumed.
+    """
+    options = {name: getattr(settings, name) for name in JOURNALED_SETTINGS if name not in exclude}
+    options.update(params)
+
+    # Paths are made absolute so the same deck matches from another directory
+    for name in ('front_dir', 'double_sided_dir', 'manifest'):
+        if options.get(name) is not None:
+            options[name] = os.path.abspath(options[name])
+
+    if os.path.isfile(options.get('deck_path') or ''):
+        options['deck_path'] = os.path.abspath(options['deck_path'])
+
+    set_journal_options(options)
+
+def get_journal_run(params: Dict[str, Any], settings: FetchSettings) -> Dict[str, Any]:
+    """Returns the deck, or kit, and output directories that pick a run's journal."""
+    run = {name: params[name] for name in ('deck_path', 'kit_path', 'output_dir') if name in params}
+    run['front_dir'] = settings.front_dir
+
+    # Paths are made absolute so the same deck matches from another directory
+    for name, value in run.items():
+        if name in ('front_dir', 'output_dir') or os.path.isfile(value or ''):
+            run[name] = os.path.abspath(value)
+
+    return run
+
+def parse_rate_limits(ctx, param, values: Tuple[str, ...]) -> Dict[str, float]:
+    rate_limits = {}
+
+    for value in values:
+        host, _, rate = value.partition('=')
+
+        try:
+            rate_limits[host.strip().lower()] = float(rate)
+        except ValueError:
+            raise BadParameter(f'"{value}" is not in the form HOST=REQUESTS_PER_SECOND.')
+
+        if not host.strip() or rate_limits[host.strip().lower()] < 0:
+            raise BadParameter(f'"{value}" is not in the form HOST=REQUESTS_PER_SECOND.')
+
+    return rate_limits
+
+# Options shared by every plugin's fetch command, keyed by their FetchSettings field
+FETCH_OPTIONS = {
+    'front_dir': option('--front_dir', default=DEFAULT_FRONT_DIR, type=click_path(file_okay=False), show_default=True, help="The directory to save front card images in."),
+    'double_sided_dir': option('--double_sided_dir', default=DEFAULT_DOUBLE_SIDED_DIR, type=click_path(file_okay=False), show_default=True, help="The directory to save the back images of double-sided cards in."),
+    'workers': option('--workers', default=DEFAULT_WORKERS, type=IntRange(min=1), show_default=True, help="The number of cards to fetch concurrently."),
+    'rate_limits': option('--rate_limit', 'rate_limits', multiple=True, callback=parse_rate_limits, metavar='HOST=RATE', help="Override the requests per second allowed for a host. Use 0 for no limit. Can be repeated."),
+    'timeout': option('--timeout', default=DEFAULT_TIMEOUT, type=FloatRange(min=0, min_open=True), show_default=True, help="The number of seconds to wait for a server to respond before giving up on a request."),
+    'retries': option('--retries', default=DEFAULT_RETRIES, type=IntRange(min=0), show_default=True, help="The number of times to retry a request after a connection error, timeout, 429 or 5XX response. Waits longer between each retry, or as long as the server asks."),
+    'cache_ttl': option('--cache_ttl', default=DEFAULT_CACHE_TTL_HOURS, type=FloatRange(min=0), show_default=True, help="The number of hours to reuse cached card data before checking the server for changes."),
+    'no_cache': option('--no_cache', default=False, is_flag=True, help="Do not read or write the card data cache."),
+    'library_dir': option('--library_dir', default=DEFAULT_LIBRARY_DIR, type=click_path(file_okay=False), show_default=True, help="The directory that keeps downloaded card art between runs."),
+    'library_size': option('--library_size', default=DEFAULT_LIBRARY_SIZE_MB, type=FloatRange(min=0), show_default=True, help="The disk budget of the card art library in megabytes. The least recently used art is evicted after each run."),
+    'copy_mode': option('--copy_mode', default=CopyMode.COPY.value, type=Choice([mode.value for mode in CopyMode], case_sensitive=False), show_default=True, help="How to write card images from the art library. \"copy\" writes every image as its own file, using a copy-on-write reflink where the file system supports it. \"link\" hardlinks every image to the library's art, which saves disk space but means editing one image in place also changes the library and every other copy of the card."),
+    'manifest': option('--manifest', type=click_path(dir_okay=False), help="Write a deck manifest for create_pdf.py --manifest. Each card's art is saved once and its copies are recorded as a quantity."),
+    'resume': option('--resume', default=False, is_flag=True, help="Continue an interrupted run of the same deck. Cards whose files were all written by the previous run with the same options are skipped."),
+    'use_async': option('--async', 'use_async', default=False, is_flag=True, help="Download card art on an asyncio engine instead of one thread per card, for fetching very large numbers of cards. Requires aiohttp."),
+    'connections': option('--connections', default=DEFAULT_CONNECTIONS, type=IntRange(min=1), show_default=True, help="The maximum number of open connections for --async downloads."),
+    'card_size': option('--card_size', default=DEFAULT_CARD_SIZE, type=Choice(list(load_card_sizes()), case_sensitive=False), show_default=True, help="The card size the art will be printed at. Used with --ppi to download the smallest image that is sharp enough."),
+    'ppi': option('--ppi', default=DEFAULT_PPI, type=IntRange(min=1), show_default=True, help="The pixels per inch (PPI) the art will be printed at. Use a lower value for quicker proof runs."),
+}
+
+@contextmanager
+def fetch_session(settings: FetchSettings, journal_run: Dict[str, Any]):
+    """Configures the shared fetch layer for a run, and finishes and cleans up after it."""
+    for host, rate in settings.rate_limits.items():
+        set_rate_limit(host, rate)
+
+    configure_http(timeout=settings.timeout, pool_size=settings.workers, retries=settings.retries)
+    configure_cache(enabled=not settings.no_cache, ttl_hours=settings.cache_ttl)
+    configure_library(directory=settings.library_dir, size_mb=settings.library_size, copy_mode=settings.copy_mode)
+    configure_manifest(settings.manifest, settings.front_dir)
+    configure_journal(journal_run, resume=settings.resume)
+    configure_renditions(card_size=settings.card_size, ppi=settings.ppi)
+
+    try:
+        configure_engine(enabled=settings.use_async, connections=settings.connections, timeout=settings.timeout, retries=settings.retries)
+    except ImportError as e:
+        raise ClickException(str(e))
+
+    try:
+        yield
+        close_engine()
+    except BaseException:
+        # Cancel downloads that are still running, such as after Ctrl-C
+        close_engine(cancel=True)
+        mark_manifest_incomplete()
+        raise
+    finally:
+        write_manifest()
+        evict_library()
+
+def fetch_options(function: Callable = None, *, exclude: Collection[str] = ()) -> Callable:
+    """
+    Adds the shared fetch options to a plugin's command.
+
+    The option values are collected into a single `settings` argument so that
+    plugins do not have to list every shared option in their signatures.
+    Options named in `exclude` are left out and keep their defaults.
+    """
+    if function is None:
+        return lambda function: fetch_options(function, exclude=exclude)
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        settings = FetchSettings(**{name: kwargs.pop(name) for name in FetchSettings.model_fields if name in kwargs})
+        set_deck_options(kwargs, settings, exclude)
+
+        with fetch_session(settings, get_journal_run(kwargs, settings)):
+            return function(*args, settings=settings, **kwargs)
+
+    for name, fetch_option in reversed(FETCH_OPTIONS.items()):
+        if name not in exclude:
+            wrapper = fetch_option(wrapper)
+
+    return wrapper
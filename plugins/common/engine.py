@@ -0,0 +1,221 @@
+import asyncio
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from hashlib import sha256
+from threading import Lock, Thread
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from .executor import DEFAULT_HOST_CONCURRENCY, HOST_CONCURRENCY, get_host
+from .http import CONNECT_TIMEOUT, DEFAULT_HEADERS, DEFAULT_TIMEOUT
+from .rate_limit import throttle_async
+from .retry import DEFAULT_RETRIES, RETRY_STATUSES, RequestRetries, parse_retry_after
+
+DEFAULT_CONNECTIONS = 64
+DEFAULT_FILE_WORKERS = 4
+
+# Downloads are written in pieces of this size, so most card art is written in one go
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+class AsyncEngine:
+    """
+    Downloads card art on an asyncio event loop running in a background thread.
+
+    Card jobs still resolve their metadata on the executor's threads, but
+    hand their art downloads to the engine and return, so thousands of
+    downloads share one bounded connection pool, one event loop thread and a
+    small pool of threads for file writes. Downloads are plain GET requests
+    for the art url, so plugins' request hooks are only used without it.
+    """
+
+    def __init__(
+        self,
+        connections: int = DEFAULT_CONNECTIONS,
+        timeout: float = DEFAULT_TIMEOUT,
+        retries: int = DEFAULT_RETRIES,
+        file_workers: int = DEFAULT_FILE_WORKERS,
+    ):
+        # aiohttp is optional, so it is only needed when the engine is used
+        try:
+            import aiohttp
+        except ImportError:
+            raise ImportError('The async fetch engine needs aiohttp. Install it with "pip install aiohttp", or run without --async.')
+
+        self.aiohttp = aiohttp
+        self.retries = retries
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = Thread(target=self.loop.run_forever, name='fetch-engine', daemon=True)
+        self.thread.start()
+
+        self.file_pool = ThreadPoolExecutor(max_workers=file_workers, thread_name_prefix='fetch-engine-files')
+
+        self.host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.in_flight: Dict[str, Future] = {}
+        self.pending: Set[Future] = set()
+        self.lock = Lock()
+
+        self.session = self.run(self.create_session(connections, timeout))
+
+    async def create_session(self, connections: int, timeout: float):
+        return self.aiohttp.ClientSession(
+            connector=self.aiohttp.TCPConnector(limit=connections),
+            timeout=self.aiohttp.ClientTimeout(sock_connect=CONNECT_TIMEOUT, sock_read=timeout),
+            headers=DEFAULT_HEADERS,
+        )
+
+    def run(self, coroutine: Awaitable) -> Any:
+        """Runs a coroutine on the engine and waits for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def submit(self, coroutine: Awaitable) -> Future:
+        """Schedules a coroutine on the engine and returns a future for its result."""
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+        with self.lock:
+            self.pending.add(future)
+
+        def forget(done: Future):
+            with self.lock:
+                self.pending.discard(done)
+
+        future.add_done_callback(forget)
+
+        return future
+
+    def submit_once(self, key: str, coroutine_function: Callable[[], Awaitable]) -> Future:
+        """Like `submit`, but concurrent callers with the same key share one future."""
+        with self.lock:
+            future = self.in_flight.get(key)
+            if future is not None:
+                return future
+
+            future = asyncio.run_coroutine_threadsafe(coroutine_function(), self.loop)
+            self.in_flight[key] = future
+            self.pending.add(future)
+
+        def forget(done: Future):
+            with self.lock:
+                self.pending.discard(done)
+
+                # Failed downloads may be tried again by later cards
+                if done.cancelled() or done.exception() is not None:
+                    self.in_flight.pop(key, None)
+
+        future.add_done_callback(forget)
+
+        return future
+
+    async def run_file(self, function: Callable, *args) -> Any:
+        """Runs blocking file work on the engine's small thread pool."""
+        return await self.loop.run_in_executor(self.file_pool, function, *args)
+
+    def get_host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = get_host(url)
+
+        if host not in self.host_semaphores:
+            self.host_semaphores[host] = asyncio.Semaphore(HOST_CONCURRENCY.get(host, DEFAULT_HOST_CONCURRENCY))
+
+        return self.host_semaphores[host]
+
+    async def stream_to_file(self, url: str, temp_path: str) -> str:
+        """
+        Streams a download to a file and returns the hash of its content.
+
+        Retries with the same `RequestRetries` as `send_request`, and
+        follows the same rate limits. Raises for any other non-2XX response.
+        """
+        retries = RequestRetries(url, self.retries)
+        while True:
+            wait = retries.get_circuit_wait()
+            if wait > 0:
+                await retries.breaker.wait_async(wait)
+                continue
+
+            try:
+                async with self.get_host_semaphore(url):
+                    await throttle_async(url)
+
+                    async with self.session.get(url) as r:
+                        if r.status not in RETRY_STATUSES:
+                            retries.record_success()
+                            r.raise_for_status()
+
+                            return await self.write_response(r, temp_path)
+
+                        delay = retries.get_retry_delay(f'{r.status} {r.reason}', r.status, parse_retry_after(r))
+                        if delay is None:
+                            r.raise_for_status()
+            except (self.aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                delay = retries.get_retry_delay(str(e))
+                if delay is None:
+                    raise
+
+            await asyncio.sleep(delay)
+
+    async def write_response(self, r, temp_path: str) -> str:
+        # The library imports the engine, so its download checks are imported here rather than at the top
+        from .library import DOWNLOAD_CHUNK_SIZE, check_received_length, get_cut_off_error
+
+        await self.run_file(lambda: os.makedirs(os.path.dirname(temp_path), exist_ok=True))
+
+        hasher = sha256()
+        buffer = bytearray()
+        f = await self.run_file(open, temp_path, 'wb')
+        try:
+            async for chunk in r.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                hasher.update(chunk)
+                buffer += chunk
+
+                if len(buffer) >= WRITE_BUFFER_SIZE:
+                    await self.run_file(f.write, bytes(buffer))
+                    buffer.clear()
+
+            if len(buffer) > 0:
+                await self.run_file(f.write, bytes(buffer))
+        except self.aiohttp.ClientPayloadError as e:
+            raise get_cut_off_error(r.url, e)
+        finally:
+            await self.run_file(f.close)
+
+        # Content-Length counts the bytes on the wire, so only compare uncompressed bodies
+        if r.content_length is not None and 'content-encoding' not in r.headers:
+            check_received_length(r.url, r.content_length, await self.run_file(os.path.getsize, temp_path))
+
+        return hasher.hexdigest()
+
+    def close(self, cancel: bool = False) -> None:
+        """Waits for every scheduled download, or cancels them, and stops the engine."""
+        with self.lock:
+            pending = list(self.pending)
+
+        for future in pending:
+            if cancel:
+                future.cancel()
+            else:
+                try:
+                    future.result()
+                except BaseException:
+                    # Failures are reported by the card jobs that scheduled them
+                    pass
+
+        self.run(self.session.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.file_pool.shutdown(wait=True)
+
+engine: Optional[AsyncEngine] = None
+
+def configure_engine(enabled: bool = False, connections: int = DEFAULT_CONNECTIONS, timeout: float = DEFAULT_TIMEOUT, retries: int = DEFAULT_RETRIES) -> None:
+    global engine
+    engine = AsyncEngine(connections=connections, timeout=timeout, retries=retries) if enabled else None
+
+def get_engine() -> Optional[AsyncEngine]:
+    return engine
+
+def close_engine(cancel: bool = False) -> None:
+    global engine
+
+    if engine is not None:
+        engine.close(cancel=cancel)
+        engine = None
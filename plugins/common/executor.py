@@ -0,0 +1,121 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from threading import BoundedSemaphore, Lock
+from typing import Callable, Dict, List, Tuple
+from urllib.parse import urlparse
+
+from .journal import find_completed, get_card_key, replay_entry, run_journaled
+from .manifest import mark_manifest_incomplete
+
+DEFAULT_WORKERS = 8
+
+# Maximum number of requests in flight per host
+# APIs with documented rate limits get fewer slots than static image CDNs
+DEFAULT_HOST_CONCURRENCY = 4
+HOST_CONCURRENCY = {
+    'api.scryfall.com': 2,
+    'api.lorcast.com': 2,
+    'riftmana.com': 2,
+    'cards.scryfall.io': 8,
+    'images.ygoprodeck.com': 8,
+}
+
+host_semaphores: Dict[str, BoundedSemaphore] = {}
+host_semaphores_lock = Lock()
+
+def get_host(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+@contextmanager
+def host_slot(url: str):
+    host = get_host(url)
+
+    with host_semaphores_lock:
+        if host not in host_semaphores:
+            host_semaphores[host] = BoundedSemaphore(HOST_CONCURRENCY.get(host, DEFAULT_HOST_CONCURRENCY))
+
+        semaphore = host_semaphores[host]
+
+    with semaphore:
+        yield
+
+class FetchExecutor:
+    """
+    Runs card jobs concurrently while keeping their output deterministic.
+
+    Parsers still call the handler once per card with its deck index, so every
+    job writes the same file names as a sequential run would. Runs of several
+    decks set `deck` before submitting each deck's cards, so that errors are
+    reported for, and only mark the manifest of, the deck they belong to.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.jobs: List[Tuple[str, str, Future]] = []
+        self.skipped = 0
+        self.deck = ''
+
+    def submit(self, label: str, fn: Callable, *args, **kwargs) -> Future:
+        card = get_card_key([*args, *kwargs.values()])
+
+        # Cards completed by a resumed run are not fetched again
+        entry = find_completed(card)
+        if entry is not None:
+            replay_entry(entry)
+            self.skipped += 1
+
+            future = Future()
+            future.set_result(None)
+            return future
+
+        def run_card():
+            return run_journaled(card, lambda: fn(*args, **kwargs))
+
+        future = self.executor.submit(run_card)
+        self.jobs.append((self.deck, label, future))
+
+        return future
+
+    def wrap(self, handle_card: Callable) -> Callable:
+        # Errors are collected and reported by `wait`, so parsers do not need to catch them
+        def submit_card(*args, **kwargs):
+            self.submit(', '.join(str(arg) for arg in [*args, *kwargs.values()]), handle_card, *args, **kwargs)
+
+        return submit_card
+
+    def wait(self) -> None:
+        error_jobs = []
+
+        # Wait in submission order so errors are reported in deck order
+        for deck, label, future in self.jobs:
+            if deck:
+                label = f'{deck}: {label}'
+
+            try:
+                # Card art may still be downloading after the job itself returned
+                background = future.result()
+                if isinstance(background, Future):
+                    background.result()
+            except Exception as e:
+                print(f'Error: {label}: {e}')
+                error_jobs.append((label, e))
+                mark_manifest_incomplete(deck)
+
+        self.jobs = []
+
+        if self.skipped > 0:
+            print(f'Skipped {self.skipped} card{"s" if self.skipped != 1 else ""} already fetched by the previous run')
+            self.skipped = 0
+
+        if len(error_jobs) > 0:
+            print(f'Errors: {error_jobs}')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self.wait()
+        finally:
+            self.executor.shutdown(wait=True, cancel_futures=exc_type is not None)
@@ -0,0 +1,117 @@
+import time
+from threading import Lock, local
+
+from requests import Response, Session
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, Timeout
+
+from .executor import DEFAULT_WORKERS, host_slot
+from .rate_limit import throttle
+from .retry import DEFAULT_RETRIES, RETRY_STATUSES, RequestRetries, parse_retry_after
+
+DEFAULT_TIMEOUT = 30
+CONNECT_TIMEOUT = 10
+
+DEFAULT_HEADERS = {
+    'user-agent': 'silhouette-card-maker/0.1',
+    'accept': '*/*',
+    'accept-encoding': 'gzip, deflate',
+    'connection': 'keep-alive',
+}
+
+class DownloadError(Exception):
+    # A download that ended early or is not a usable file, which is worth downloading again
+    pass
+
+# Every thread gets its own session so that cookies and other session state
+# are never shared, but all sessions mount the same adapter so that
+# connections are pooled and kept alive across threads
+session_state = local()
+adapter_lock = Lock()
+adapter: HTTPAdapter | None = None
+read_timeout: float = DEFAULT_TIMEOUT
+max_retries: int = DEFAULT_RETRIES
+
+def configure_http(timeout: float = DEFAULT_TIMEOUT, pool_size: int = DEFAULT_WORKERS, retries: int = DEFAULT_RETRIES) -> None:
+    global adapter, read_timeout, max_retries
+
+    with adapter_lock:
+        read_timeout = timeout
+        max_retries = retries
+
+        if adapter is not None:
+            adapter.close()
+
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=pool_size)
+
+def get_adapter() -> HTTPAdapter:
+    if adapter is None:
+        configure_http(read_timeout)
+
+    return adapter
+
+def get_session() -> Session:
+    shared_adapter = get_adapter()
+
+    session = getattr(session_state, 'session', None)
+    if session is None or session_state.adapter is not shared_adapter:
+        session = Session()
+        session.headers.update(DEFAULT_HEADERS)
+        session.mount('https://', shared_adapter)
+        session.mount('http://', shared_adapter)
+
+        session_state.session = session
+        session_state.adapter = shared_adapter
+
+    return session
+
+def send_request(method: str, query: str, **kwargs) -> Response:
+    """
+    Sends a request through the shared connection pool, retrying transient failures.
+
+    Each attempt waits for a free slot and a rate limit token for its host.
+    Transient failures are retried as `RequestRetries` decides, and hosts
+    that keep failing are given a rest by their circuit breaker. Raises for
+    any other non-2XX response.
+    """
+    kwargs.setdefault('timeout', (CONNECT_TIMEOUT, read_timeout))
+
+    retries = RequestRetries(query, max_retries)
+    while True:
+        wait = retries.get_circuit_wait()
+        if wait > 0:
+            retries.breaker.wait(wait)
+            continue
+
+        try:
+            with host_slot(query):
+                throttle(query)
+                r = get_session().request(method, query, **kwargs)
+        except (ConnectionError, Timeout) as e:
+            delay = retries.get_retry_delay(str(e))
+            if delay is None:
+                raise
+        else:
+            if r.status_code not in RETRY_STATUSES:
+                retries.record_success()
+
+                # Check for 2XX response code
+                r.raise_for_status()
+
+                return r
+
+            delay = retries.get_retry_delay(f'{r.status_code} {r.reason}', r.status_code, parse_retry_after(r))
+            if delay is None:
+                r.raise_for_status()
+
+            r.close()
+
+        time.sleep(delay)
+
+def request_get(query: str, **kwargs) -> Response:
+    """Sends a GET request with `send_request`."""
+    return send_request('GET', query, **kwargs)
+
+def request_post(query: str, **kwargs) -> Response:
+    """Sends a POST request with `send_request`."""
+    return send_request('POST', query, **kwargs)
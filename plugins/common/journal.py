@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+from concurrent.futures import Future
+from threading import Lock, local
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, ValidationError
+
+from .manifest import is_manifest_enabled, record_back, record_card
+
+DEFAULT_JOURNAL_DIR = os.path.join('game', 'cache', 'journals')
+
+class JournalOutput(BaseModel):
+    # Files written for one face of a card, with their sizes when written
+    paths: List[str]
+    sizes: List[int]
+    quantity: int
+    back_of: Optional[str] = None
+
+class JournalEntry(BaseModel):
+    card: str
+    outputs: List[JournalOutput] = []
+
+journal_path: Optional[str] = None
+journal_lock = Lock()
+
+# Separates the cards of decks fetched in the same run, such as a kit
+journal_scope = ''
+
+# Hash of the deck and the options that change the files written for its cards
+journal_options = ''
+
+# Entries from an earlier run, keyed by card
+completed_entries: Dict[str, JournalEntry] = {}
+
+# Outputs and unfinished writes of the card that the current thread is fetching
+current_card = local()
+
+def read_journal(path: str) -> Dict[str, JournalEntry]:
+    entries = {}
+
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = JournalEntry.model_validate_json(line)
+                except ValidationError:
+                    # The last line is cut short if the run was killed while writing it
+                    continue
+
+                entries[entry.card] = entry
+    except OSError:
+        pass
+
+    return entries
+
+def get_journal_path(run: Dict[str, Any], directory: str = DEFAULT_JOURNAL_DIR) -> str:
+    # Each deck, or kit, and output directory gets its own journal, so other runs do not wipe it
+    run_hash = hashlib.sha256(json.dumps(run, default=str, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(directory, f'{run_hash}.jsonl')
+
+def configure_journal(run: Dict[str, Any], resume: bool = False, directory: str = DEFAULT_JOURNAL_DIR) -> None:
+    """
+    Starts the journal of completed cards for this run.
+
+    `run` identifies the deck and where its cards are written, and picks the
+    journal file. With `resume`, cards completed by the previous run of the
+    same deck are loaded so they can be skipped. Otherwise its journal
+    starts over.
+    """
+    global journal_path
+
+    path = get_journal_path(run, directory)
+
+    with journal_lock:
+        journal_path = path
+        completed_entries.clear()
+
+        if resume:
+            completed_entries.update(read_journal(path))
+            print(f'Resuming with {len(completed_entries)} completed card{"s" if len(completed_entries) != 1 else ""} from {path}')
+        else:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            open(path, 'w', encoding='utf-8').close()
+
+def set_journal_scope(scope: str) -> None:
+    global journal_scope
+    journal_scope = scope
+
+def set_journal_options(options: Dict[str, Any]) -> None:
+    """
+    Sets the deck and options that the following cards are fetched with.
+
+    Options such as a preferred set or the card size are not among a card's
+    arguments but change the art it gets, so a card is only skipped when
+    the previous run fetched it with the same options.
+    """
+    global journal_options
+    journal_options = hashlib.sha256(json.dumps(options, default=str, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+def get_card_key(args: List[Any]) -> str:
+    # The arguments a card was fetched with identify it, including its deck index
+    if journal_scope:
+        args = [journal_scope, *args]
+
+    return json.dumps([journal_options, *args], default=str)
+
+def is_output_intact(output: JournalOutput) -> bool:
+    for path, size in zip(output.paths, output.sizes):
+        try:
+            if os.path.getsize(path) != size:
+                return False
+        except OSError:
+            return False
+
+    return True
+
+def find_completed(card: str) -> Optional[JournalEntry]:
+    """Returns the journal entry of a card if its files are all still in place."""
+    entry = completed_entries.get(card)
+    if entry is None or not all(is_output_intact(output) for output in entry.outputs):
+        return None
+
+    return entry
+
+def replay_entry(entry: JournalEntry) -> None:
+    """Records a skipped card in the deck manifest, as if it had been fetched again."""
+    if not is_manifest_enabled():
+        return
+
+    for output in entry.outputs:
+        if output.back_of is not None:
+            record_back(output.back_of, output.paths[0])
+        else:
+            record_card(output.paths[0], output.quantity)
+
+def append_entry(entry: JournalEntry) -> None:
+    if journal_path is None:
+        return
+
+    with journal_lock:
+        # Flushed line by line so a killed run keeps every completed card
+        with open(journal_path, 'a', encoding='utf-8') as f:
+            f.write(entry.model_dump_json() + '\n')
+
+def run_journaled(card: str, fn: Callable[[], Any]) -> Optional[Future]:
+    """
+    Runs a card job and journals the files it wrote once it completes.
+
+    When the job left writes to finish in the background, returns a future
+    that completes, and journals the card, once they are all done.
+    """
+    current_card.outputs = []
+    current_card.pending = []
+
+    try:
+        fn()
+        outputs = current_card.outputs
+        pending = current_card.pending
+    finally:
+        current_card.outputs = None
+        current_card.pending = None
+
+    if len(pending) == 0:
+        append_entry(JournalEntry(card=card, outputs=outputs))
+        return None
+
+    done = Future()
+    remaining = [len(pending)]
+    done_lock = Lock()
+
+    def on_write_done(write: Future):
+        with done_lock:
+            remaining[0] -= 1
+
+            if done.done():
+                return
+
+            if write.cancelled():
+                done.cancel()
+            elif write.exception() is not None:
+                done.set_exception(write.exception())
+            elif remaining[0] == 0:
+                append_entry(JournalEntry(card=card, outputs=outputs))
+                done.set_result(None)
+
+    for write in pending:
+        write.add_done_callback(on_write_done)
+
+    return done
+
+def add_pending(write: Future) -> None:
+    """Ties a background write to the card that the current thread is fetching."""
+    pending = getattr(current_card, 'pending', None)
+    if pending is not None:
+        pending.append(write)
+
+def get_current_outputs() -> Optional[List[JournalOutput]]:
+    return getattr(current_card, 'outputs', None)
+
+def record_outputs(paths: List[str], quantity: int, back_of: Optional[str] = None, outputs: Optional[List[JournalOutput]] = None) -> None:
+    if outputs is None:
+        outputs = get_current_outputs()
+        if outputs is None:
+            return
+
+    outputs.append(JournalOutput(paths=paths, sizes=[os.path.getsize(path) for path in paths], quantity=quantity, back_of=back_of))
@@ -0,0 +1,416 @@
+import asyncio
+import os
+import shutil
+from concurrent.futures import Future
+from enum import Enum
+from hashlib import sha256
+from threading import Lock, get_ident
+from typing import Callable, Dict, List, Optional
+
+from PIL import Image
+from pydantic import BaseModel
+from requests import Response
+from requests.exceptions import ChunkedEncodingError, ContentDecodingError
+
+from .engine import AsyncEngine, get_engine
+from .http import DownloadError, request_get
+from .journal import JournalOutput, add_pending, get_current_outputs, record_outputs
+from .manifest import is_manifest_enabled, record_back, record_card
+
+try:
+    from fcntl import ioctl
+except ImportError:
+    ioctl = None
+
+DEFAULT_LIBRARY_DIR = os.path.join('game', 'library')
+DEFAULT_LIBRARY_SIZE_MB = 2048
+
+# Linux ioctl that clones a file's extents on copy-on-write file systems
+FICLONE = 0x40049409
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_ATTEMPTS = 3
+
+class PendingArt:
+    """Card art that the async engine is still downloading into the library."""
+
+    def __init__(self, future: Future):
+        self.future = future
+
+class CopyMode(str, Enum):
+    LINK = 'link'
+    COPY = 'copy'
+
+class LibrarySettings(BaseModel):
+    directory: str = DEFAULT_LIBRARY_DIR
+    size_bytes: int = DEFAULT_LIBRARY_SIZE_MB * 1024 * 1024
+    copy_mode: CopyMode = CopyMode.COPY
+
+library_settings = LibrarySettings()
+
+# Serializes downloads of the same key so that concurrent cards share one request
+key_locks: Dict[str, Lock] = {}
+key_locks_lock = Lock()
+
+def configure_library(directory: str = DEFAULT_LIBRARY_DIR, size_mb: float = DEFAULT_LIBRARY_SIZE_MB, copy_mode: CopyMode = CopyMode.COPY) -> None:
+    global library_settings
+    library_settings = LibrarySettings(directory=directory, size_bytes=int(size_mb * 1024 * 1024), copy_mode=copy_mode)
+
+def get_key_hash(game: str, source: str, version: str) -> str:
+    return sha256('\0'.join([game, source, version]).encode('utf-8')).hexdigest()
+
+def get_key_path(key_hash: str) -> str:
+    return os.path.join(library_settings.directory, 'keys', key_hash[:2], key_hash)
+
+def get_object_path(object_hash: str) -> str:
+    return os.path.join(library_settings.directory, 'objects', object_hash[:2], object_hash)
+
+def get_temp_path(key_hash: str) -> str:
+    # Temporary files live in the library so they can be renamed into place
+    return os.path.join(library_settings.directory, 'tmp', f'{key_hash}.{os.getpid()}.{get_ident()}.tmp')
+
+def get_key_lock(key_hash: str) -> Lock:
+    with key_locks_lock:
+        if key_hash not in key_locks:
+            key_locks[key_hash] = Lock()
+
+        return key_locks[key_hash]
+
+def write_atomic(path: str, content: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    temp_path = f'{path}.{os.getpid()}.{get_ident()}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(content)
+
+    os.replace(temp_path, path)
+
+def find_object(key_hash: str) -> Optional[str]:
+    try:
+        with open(get_key_path(key_hash), 'r', encoding='utf-8') as f:
+            object_path = get_object_path(f.read().strip())
+    except OSError:
+        return None
+
+    if not os.path.isfile(object_path):
+        return None
+
+    # Mark the object as recently used for eviction
+    os.utime(object_path)
+
+    return object_path
+
+def store_object(key_hash: str, content: bytes) -> str:
+    object_hash = sha256(content).hexdigest()
+    object_path = get_object_path(object_hash)
+
+    # Identical images from different keys are only stored once
+    if os.path.isfile(object_path):
+        os.utime(object_path)
+    else:
+        write_atomic(object_path, content)
+
+    write_atomic(get_key_path(key_hash), object_hash.encode('utf-8'))
+
+    return object_path
+
+def store_object_file(key_hash: str, temp_path: str, object_hash: str) -> str:
+    object_path = get_object_path(object_hash)
+
+    if os.path.isfile(object_path):
+        os.utime(object_path)
+        os.remove(temp_path)
+    else:
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        os.replace(temp_path, object_path)
+
+    write_atomic(get_key_path(key_hash), object_hash.encode('utf-8'))
+
+    return object_path
+
+def remove_file(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+
+def verify_image(path: str, url: str) -> None:
+    # Only reads the headers and structure, without decoding the pixels
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except Exception as e:
+        raise DownloadError(f'Received an unreadable image from {url}: {e}')
+
+def get_cut_off_error(url: str, e: Exception) -> DownloadError:
+    # The connection dropped partway through the body, after the request itself succeeded
+    return DownloadError(f'Download from {url} was cut off: {e}')
+
+def check_received_length(url: str, expected_length: Optional[int], received_length: int) -> None:
+    if expected_length is not None and received_length != expected_length:
+        raise DownloadError(f'Received {received_length} of {expected_length} bytes from {url}')
+
+def download_to_file(url: str, request: Callable[..., Response], temp_path: str) -> str:
+    """
+    Streams a download to a file in chunks and returns the hash of its content.
+
+    Raises a DownloadError when the body is cut off or shorter than its
+    Content-Length, or is not a readable image. Errors sending the request
+    are raised unchanged, since `request` has already retried them.
+    """
+    os.makedirs(os.path.dirname(temp_path), exist_ok=True)
+
+    hasher = sha256()
+    r = request(url, stream=True)
+    try:
+        with open(temp_path, 'wb') as f:
+            try:
+                for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    f.write(chunk)
+                    hasher.update(chunk)
+            except (ChunkedEncodingError, ContentDecodingError) as e:
+                raise get_cut_off_error(url, e)
+
+        # Content-Length counts the bytes on the wire, before any decompression
+        expected_length = r.headers.get('content-length')
+        received_length = r.raw.tell() if r.raw is not None else os.path.getsize(temp_path)
+        check_received_length(url, int(expected_length) if expected_length is not None else None, received_length)
+    finally:
+        r.close()
+
+    verify_image(temp_path, url)
+
+    return hasher.hexdigest()
+
+def download_object(key_hash: str, url: str, request: Callable[..., Response], convert: Optional[Callable[[bytes], bytes]]) -> str:
+    """Downloads art into the library, retrying truncated or unreadable downloads."""
+    temp_path = get_temp_path(key_hash)
+
+    for attempt in range(DOWNLOAD_ATTEMPTS):
+        try:
+            object_hash = download_to_file(url, request, temp_path)
+            break
+        except DownloadError as e:
+            remove_file(temp_path)
+
+            if attempt + 1 == DOWNLOAD_ATTEMPTS:
+                raise DownloadError(f'Could not download a valid image from {url} after {DOWNLOAD_ATTEMPTS} attempts: {e}')
+
+            print(f'Retrying {url}: {e}')
+        except BaseException:
+            # Request errors were already retried by send_request
+            remove_file(temp_path)
+            raise
+
+    if convert is not None:
+        with open(temp_path, 'rb') as f:
+            content = convert(f.read())
+
+        os.remove(temp_path)
+        return store_object(key_hash, content)
+
+    return store_object_file(key_hash, temp_path, object_hash)
+
+def convert_file(temp_path: str, convert: Callable[[bytes], bytes]) -> bytes:
+    with open(temp_path, 'rb') as f:
+        content = convert(f.read())
+
+    os.remove(temp_path)
+
+    return content
+
+async def download_object_async(engine: AsyncEngine, key_hash: str, url: str, convert: Optional[Callable[[bytes], bytes]]) -> str:
+    """Like `download_object`, but downloads on the async engine."""
+    temp_path = get_temp_path(key_hash)
+
+    for attempt in range(DOWNLOAD_ATTEMPTS):
+        try:
+            object_hash = await engine.stream_to_file(url, temp_path)
+            await engine.run_file(verify_image, temp_path, url)
+            break
+        except DownloadError as e:
+            remove_file(temp_path)
+
+            if attempt + 1 == DOWNLOAD_ATTEMPTS:
+                raise DownloadError(f'Could not download a valid image from {url} after {DOWNLOAD_ATTEMPTS} attempts: {e}')
+
+            print(f'Retrying {url}: {e}')
+        except BaseException:
+            # Request errors were already retried by the engine, and cancellation
+            remove_file(temp_path)
+            raise
+
+    if convert is not None:
+        content = await engine.run_file(convert_file, temp_path, convert)
+        return await engine.run_file(store_object, key_hash, content)
+
+    return await engine.run_file(store_object_file, key_hash, temp_path, object_hash)
+
+async def request_card_art_async(engine: AsyncEngine, key_hash: str, url: str, convert: Optional[Callable[[bytes], bytes]]) -> str:
+    object_path = await engine.run_file(find_object, key_hash)
+
+    if object_path is None:
+        object_path = await download_object_async(engine, key_hash, url, convert)
+
+    return object_path
+
+def request_card_art(
+    game: str,
+    url: str,
+    request: Callable[..., Response] = request_get,
+    version: str = '',
+    convert: Optional[Callable[[bytes], bytes]] = None,
+) -> str:
+    """
+    Returns the path of the card art for a url in the local library.
+
+    Art is keyed by game, source url and image version, and is only
+    downloaded when the library does not already have it. Downloads are
+    streamed to disk and checked before they are added to the library.
+    `request` is called with `stream=True`. `convert` is applied before
+    storing, so converted art needs its own `version`.
+
+    With the async engine, the download is scheduled instead and the art is
+    returned as PendingArt for `save_card_art`. The engine sends a plain GET
+    request for the url, without `request`.
+    """
+    key_hash = get_key_hash(game, url, version)
+
+    engine = get_engine()
+    if engine is not None:
+        return PendingArt(engine.submit_once(key_hash, lambda: request_card_art_async(engine, key_hash, url, convert)))
+
+    with get_key_lock(key_hash):
+        object_path = find_object(key_hash)
+
+        if object_path is None:
+            object_path = download_object(key_hash, url, request, convert)
+
+    return object_path
+
+def reflink(source_path: str, destination_path: str) -> None:
+    if ioctl is None:
+        raise OSError('Reflinks are not supported on this platform')
+
+    with open(source_path, 'rb') as source, open(destination_path, 'wb') as destination:
+        ioctl(destination.fileno(), FICLONE, source.fileno())
+
+def materialize(source_path: str, destination_path: str, links=(reflink, os.link)) -> None:
+    """
+    Places a copy of a file at the destination as cheaply as possible.
+
+    Tries a copy-on-write reflink first, then a hardlink, and only copies the
+    bytes when neither is supported between the two locations.
+    """
+    for link in links:
+        if os.path.lexists(destination_path):
+            os.remove(destination_path)
+
+        try:
+            link(source_path, destination_path)
+            return
+        except OSError:
+            pass
+
+    if os.path.lexists(destination_path):
+        os.remove(destination_path)
+
+    shutil.copyfile(source_path, destination_path)
+
+def save_card_art(card_art_path: str | PendingArt, image_paths: List[str], back_of: Optional[List[str]] = None) -> List[str]:
+    """
+    Places the card art at every image path, one path per copy of the card,
+    and returns the paths that are written.
+
+    Each copy is a reflink of the library's art where the file system supports
+    it, and a copy of the bytes otherwise, so editing one image never changes
+    the library or the other copies. With the "link" copy mode, the copies are
+    hardlinks to the library's art instead. When writing a deck manifest, only
+    the first copy is written and the rest are recorded as its quantity.
+    `back_of` marks the art as the back face of those images. Art that is
+    still downloading is saved by the async engine once it arrives.
+    """
+    if len(image_paths) == 0:
+        return []
+
+    if isinstance(card_art_path, PendingArt):
+        save_pending_card_art(card_art_path, image_paths, back_of)
+    else:
+        write_card_art(card_art_path, image_paths, back_of)
+
+    return image_paths[:1] if is_manifest_card(image_paths, back_of) else image_paths
+
+def is_manifest_card(image_paths: List[str], back_of: Optional[List[str]]) -> bool:
+    return is_manifest_enabled(back_of[0] if back_of is not None else image_paths[0])
+
+def get_copy_links():
+    # Reflinks are still independent files, unlike hardlinks
+    if library_settings.copy_mode == CopyMode.COPY:
+        return (reflink,)
+
+    return (reflink, os.link)
+
+def save_pending_card_art(pending_art: PendingArt, image_paths: List[str], back_of: Optional[List[str]]) -> None:
+    engine = get_engine()
+    outputs = get_current_outputs()
+
+    async def save_when_downloaded():
+        card_art_path = await asyncio.wrap_future(pending_art.future)
+        await engine.run_file(write_card_art, card_art_path, image_paths, back_of, outputs)
+
+    add_pending(engine.submit(save_when_downloaded()))
+
+def write_card_art(card_art_path: str, image_paths: List[str], back_of: Optional[List[str]] = None, outputs: Optional[List[JournalOutput]] = None) -> None:
+    back_of_path = back_of[0] if back_of is not None else None
+
+    if is_manifest_card(image_paths, back_of):
+        materialize(card_art_path, image_paths[0], links=get_copy_links())
+
+        if back_of_path is not None:
+            record_back(back_of_path, image_paths[0])
+        else:
+            record_card(image_paths[0], len(image_paths))
+
+        record_outputs(image_paths[:1], len(image_paths), back_of_path, outputs)
+        return
+
+    for image_path in image_paths:
+        materialize(card_art_path, image_path, links=get_copy_links())
+
+    record_outputs(image_paths, len(image_paths), back_of_path, outputs)
+
+def evict_library() -> None:
+    """Deletes the least recently used art until the library fits its size budget."""
+    objects_dir = os.path.join(library_settings.directory, 'objects')
+    if not os.path.isdir(objects_dir):
+        return
+
+    objects = []
+    for root, _, files in os.walk(objects_dir):
+        for file in files:
+            path = os.path.join(root, file)
+
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+
+            objects.append((stat.st_mtime, stat.st_size, path))
+
+    total_size = sum(size for _, size, _ in objects)
+    if total_size <= library_settings.size_bytes:
+        return
+
+    evicted = 0
+    for _, size, path in sorted(objects):
+        if total_size <= library_settings.size_bytes:
+            break
+
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+
+        total_size -= size
+        evicted += 1
+
+    # Keys that point at evicted art are left behind and treated as misses
+    print(f'Evicted {evicted} image{"s" if evicted != 1 else ""} from the card art library')
@@ -0,0 +1,107 @@
+import os
+from threading import Lock
+from typing import Dict, Optional
+
+from natsort import natsorted
+
+from deck_manifest import DeckManifest, ManifestCard, save_deck_manifest
+
+class ManifestRecording:
+    """The cards recorded for one deck's manifest."""
+
+    def __init__(self, path: str, front_dir: str):
+        self.path = path
+        self.front_dir = os.path.abspath(front_dir)
+        self.complete = True
+
+        # Image paths of the recorded cards, keyed by front image path
+        self.quantities: Dict[str, int] = {}
+        self.backs: Dict[str, str] = {}
+
+manifest_lock = Lock()
+
+# Manifests being recorded, keyed by deck. A run of a single deck uses the empty key
+manifests: Dict[str, ManifestRecording] = {}
+
+def configure_manifest(path: Optional[str], front_dir: str) -> None:
+    """Starts the run over, recording a manifest for the deck saved in `front_dir` when `path` is set."""
+    with manifest_lock:
+        manifests.clear()
+
+    if path is not None:
+        add_manifest('', path, front_dir)
+
+def add_manifest(deck: str, path: str, front_dir: str) -> None:
+    """Records a manifest for another deck of the run, whose front images are saved in `front_dir`."""
+    with manifest_lock:
+        manifests[deck] = ManifestRecording(path, front_dir)
+
+def get_manifest(front_image_path: str) -> Optional[ManifestRecording]:
+    # Plugins save front images directly in their deck's front directory
+    front_dir = os.path.dirname(os.path.abspath(front_image_path))
+
+    for manifest in manifests.values():
+        if manifest.front_dir == front_dir:
+            return manifest
+
+    return None
+
+def is_manifest_enabled(front_image_path: Optional[str] = None) -> bool:
+    """Returns whether a card is recorded in a manifest, or with no card, whether any deck is."""
+    if front_image_path is None:
+        return len(manifests) > 0
+
+    return get_manifest(front_image_path) is not None
+
+def record_card(front_image_path: str, quantity: int) -> None:
+    with manifest_lock:
+        manifest = get_manifest(front_image_path)
+        if manifest is not None:
+            manifest.quantities[front_image_path] = manifest.quantities.get(front_image_path, 0) + quantity
+
+def record_back(front_image_path: str, back_image_path: str) -> None:
+    with manifest_lock:
+        manifest = get_manifest(front_image_path)
+        if manifest is not None:
+            manifest.backs[front_image_path] = back_image_path
+
+def mark_manifest_incomplete(deck: Optional[str] = None) -> None:
+    """
+    Marks a deck's manifest so that create_pdf.py refuses it, after cards failed to fetch.
+
+    Without a deck, every manifest of the run is marked.
+    """
+    with manifest_lock:
+        for manifest_deck, manifest in manifests.items():
+            if deck is None or manifest_deck == deck:
+                manifest.complete = False
+
+def write_manifest() -> None:
+    with manifest_lock:
+        recorded = list(manifests.values())
+
+    for manifest in recorded:
+        manifest_dir = os.path.dirname(os.path.abspath(manifest.path))
+
+        def relative_path(path: str) -> str:
+            return os.path.relpath(os.path.abspath(path), manifest_dir).replace(os.sep, '/')
+
+        with manifest_lock:
+            # Plugins prefix file names with the deck index, so natural order is deck order
+            cards = [
+                ManifestCard(
+                    front=relative_path(front_image_path),
+                    back=relative_path(manifest.backs[front_image_path]) if front_image_path in manifest.backs else None,
+                    quantity=quantity
+                )
+                for front_image_path, quantity in natsorted(manifest.quantities.items())
+            ]
+
+            complete = manifest.complete
+
+        save_deck_manifest(DeckManifest(complete=complete, cards=cards), manifest.path)
+
+        if complete:
+            print(f'Wrote deck manifest with {len(cards)} unique card{"s" if len(cards) != 1 else ""}: {manifest.path}')
+        else:
+            print(f'Wrote incomplete deck manifest with {len(cards)} unique card{"s" if len(cards) != 1 else ""}, fetch the deck again before using it: {manifest.path}')
@@ -0,0 +1,244 @@
+import asyncio
+import math
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import Lock
+from typing import Callable, Dict, List, Optional
+
+from requests import Response
+
+from .engine import AsyncEngine, get_engine
+from .executor import get_host
+from .http import request_get
+from .library import PendingArt, find_object, get_key_hash, request_card_art, request_card_art_async
+
+# Weight of the newest download in a mirror's average latency
+LATENCY_SMOOTHING = 0.3
+
+# A mirror other than the preferred one is only tried first when it is this many times faster
+SWITCH_FACTOR = 2
+
+# Latency counted against a mirror when a download from it fails
+FAILURE_LATENCY = 30
+
+# Responses that mean a mirror does not have the art, rather than that it is unwell
+MISSING_STATUSES = {404, 410}
+
+HEDGE_WORKERS = 16
+
+class MirrorLatency:
+    """Keeps a moving average of how long downloads from each mirror take."""
+
+    def __init__(self, smoothing: float = LATENCY_SMOOTHING):
+        self.smoothing = smoothing
+        self.latencies: Dict[str, float] = {}
+        self.lock = Lock()
+
+    def record(self, url: str, seconds: float) -> None:
+        host = get_host(url)
+
+        with self.lock:
+            latency = self.latencies.get(host)
+            self.latencies[host] = seconds if latency is None else self.smoothing * seconds + (1 - self.smoothing) * latency
+
+    def record_error(self, url: str, seconds: float, error: BaseException) -> None:
+        if get_error_status(error) in MISSING_STATUSES:
+            return
+
+        self.record(url, max(seconds, FAILURE_LATENCY))
+
+    def get(self, url: str) -> Optional[float]:
+        with self.lock:
+            return self.latencies.get(get_host(url))
+
+    def order(self, urls: List[str]) -> List[str]:
+        """
+        Returns mirror urls in the order to try them, the preferred mirror first.
+
+        Another mirror moves ahead of the preferred one once it has proven
+        much faster. Mirrors that have not been measured yet keep their place.
+        """
+        def score(item):
+            index, url = item
+            latency = self.get(url)
+            if latency is None:
+                return 0 if index == 0 else math.inf
+
+            return latency if index == 0 else latency * SWITCH_FACTOR
+
+        return [url for _, url in sorted(enumerate(urls), key=score)]
+
+mirror_latency = MirrorLatency()
+
+hedge_pool: Optional[ThreadPoolExecutor] = None
+hedge_pool_lock = Lock()
+
+def get_error_status(error: BaseException) -> Optional[int]:
+    # requests keeps the status on the response, aiohttp on the error itself
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None) or getattr(error, 'status', None)
+
+def get_hedge_pool() -> ThreadPoolExecutor:
+    global hedge_pool
+
+    with hedge_pool_lock:
+        if hedge_pool is None:
+            hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix='fetch-hedge')
+
+        return hedge_pool
+
+def find_mirrored_object(game: str, urls: List[str]) -> Optional[str]:
+    for url in urls:
+        object_path = find_object(get_key_hash(game, url, ''))
+        if object_path is not None:
+            return object_path
+
+    return None
+
+def request_timed(game: str, url: str, request: Callable[..., Response]) -> str:
+    start = time.monotonic()
+
+    try:
+        object_path = request_card_art(game, url, request)
+    except Exception as e:
+        mirror_latency.record_error(url, time.monotonic() - start, e)
+        raise
+
+    mirror_latency.record(url, time.monotonic() - start)
+    return object_path
+
+def request_mirrored(game: str, urls: List[str], request: Callable[..., Response], hedge_after: Optional[float]) -> str:
+    """
+    Downloads art that several mirrors serve, moving on to the next mirror on errors.
+
+    With `hedge_after`, the next mirror is also asked when the current one
+    has not finished after that many seconds, and whichever finishes first
+    wins. Raises the last error when every mirror fails.
+    """
+    object_path = find_mirrored_object(game, urls)
+    if object_path is not None:
+        return object_path
+
+    remaining = mirror_latency.order(urls)
+    last_error = None
+
+    if hedge_after is None:
+        for url in remaining:
+            try:
+                return request_timed(game, url, request)
+            except Exception as e:
+                print(f'Could not fetch {url}: {e}')
+                last_error = e
+
+        raise last_error
+
+    # Downloads that lose the race still finish in the background and are kept in the library
+    pool = get_hedge_pool()
+    futures = {}
+    while len(remaining) > 0 or len(futures) > 0:
+        if len(futures) == 0 or len(remaining) > 0:
+            url = remaining.pop(0)
+            futures[pool.submit(request_timed, game, url, request)] = url
+
+        timeout = hedge_after if len(remaining) > 0 else None
+        done, _ = wait(futures, timeout=timeout, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            url = futures.pop(future)
+            if future.exception() is None:
+                return future.result()
+
+            print(f'Could not fetch {url}: {future.exception()}')
+            last_error = future.exception()
+
+    raise last_error
+
+async def request_timed_async(engine: AsyncEngine, game: str, url: str) -> str:
+    start = time.monotonic()
+
+    try:
+        object_path = await request_card_art_async(engine, get_key_hash(game, url, ''), url, None)
+    except asyncio.CancelledError:
+        # A download that lost a race took at least this long
+        mirror_latency.record(url, time.monotonic() - start)
+        raise
+    except Exception as e:
+        mirror_latency.record_error(url, time.monotonic() - start, e)
+        raise
+
+    mirror_latency.record(url, time.monotonic() - start)
+    return object_path
+
+async def request_mirrored_async(engine: AsyncEngine, game: str, urls: List[str], hedge_after: Optional[float]) -> str:
+    """Like `request_mirrored`, but on the async engine, where downloads that lose a race are cancelled."""
+    object_path = await engine.run_file(find_mirrored_object, game, urls)
+    if object_path is not None:
+        return object_path
+
+    remaining = mirror_latency.order(urls)
+    last_error = None
+
+    tasks = {}
+    try:
+        while len(remaining) > 0 or len(tasks) > 0:
+            if len(tasks) == 0 or (hedge_after is not None and len(remaining) > 0):
+                url = remaining.pop(0)
+                tasks[asyncio.ensure_future(request_timed_async(engine, game, url))] = url
+
+            timeout = hedge_after if len(remaining) > 0 else None
+            done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                url = tasks.pop(task)
+                if task.exception() is None:
+                    return task.result()
+
+                print(f'Could not fetch {url}: {task.exception()}')
+                last_error = task.exception()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    raise last_error
+
+async def request_variants_async(engine: AsyncEngine, game: str, variants: List[List[str]], hedge_after: Optional[float]) -> str:
+    last_error = None
+    for urls in variants:
+        try:
+            return await request_mirrored_async(engine, game, urls, hedge_after)
+        except Exception as e:
+            last_error = e
+
+    raise last_error
+
+def request_card_art_from_mirrors(
+    game: str,
+    variants: List[List[str]],
+    request: Callable[..., Response] = request_get,
+    hedge_after: Optional[float] = None,
+) -> str | PendingArt:
+    """
+    Returns the path of card art in the local library, trying mirrors and variants.
+
+    `variants` are urls of acceptable art in order of preference, and each
+    variant lists the same art on every mirror, the preferred mirror first.
+    Each variant is tried on every mirror before the next variant. Mirrors
+    are reordered by how fast they have been during this run.
+
+    With the async engine, the downloads are scheduled instead, as plain GET
+    requests without `request`, and the art is returned as PendingArt for
+    `save_card_art`.
+    """
+    engine = get_engine()
+    if engine is not None:
+        key = get_key_hash(game, ' '.join(url for urls in variants for url in urls), 'mirrors')
+        return PendingArt(engine.submit_once(key, lambda: request_variants_async(engine, game, variants, hedge_after)))
+
+    last_error = None
+    for urls in variants:
+        try:
+            return request_mirrored(game, urls, request, hedge_after)
+        except Exception as e:
+            last_error = e
+
+    raise last_error
@@ -0,0 +1,106 @@
+import asyncio
+import time
+from threading import Lock
+from typing import Dict, Optional
+
+from .executor import get_host
+
+# Sustained requests per second allowed for each host, None for no limit
+# APIs follow their documented limits, static image CDNs are not throttled
+DEFAULT_RATE_LIMIT = 10
+HOST_RATE_LIMITS: Dict[str, Optional[float]] = {
+    'api.scryfall.com': 10,
+    'api.lorcast.com': 10,
+    'api.gatcg.com': 10,
+    'api.altered.gg': 10,
+    'api-preview.netrunnerdb.com': 10,
+    'cards.fabtcg.com': 10,
+    'piltoverarchive.com': 10,
+    'riftmana.com': 5,
+    'cards.scryfall.io': None,
+    'images.ygoprodeck.com': None,
+    'en.onepiece-cardgame.com': None,
+    'www.gundam-gcg.com': None,
+    'world.digimoncard.com': None,
+    'nro-public.s3.nl-ams.scw.cloud': None,
+}
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second with bursts of up to `capacity` requests.
+
+    Callers reserve a token before sleeping, so concurrent callers queue up
+    behind each other instead of all waking at once and exceeding the rate.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = Lock()
+
+    def reserve(self) -> float:
+        """Takes a token and returns how long to wait before it may be used."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+
+            if self.tokens >= 0:
+                return 0
+
+            return -self.tokens / self.rate
+
+    def acquire(self) -> None:
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Holds back every caller for at least `seconds`, such as when a server asks to slow down."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+host_buckets: Dict[str, Optional[TokenBucket]] = {}
+host_buckets_lock = Lock()
+
+def set_rate_limit(host: str, rate: Optional[float]) -> None:
+    with host_buckets_lock:
+        HOST_RATE_LIMITS[host] = rate
+        host_buckets.pop(host, None)
+
+def get_bucket(url: str) -> Optional[TokenBucket]:
+    host = get_host(url)
+
+    with host_buckets_lock:
+        if host not in host_buckets:
+            rate = HOST_RATE_LIMITS.get(host, DEFAULT_RATE_LIMIT)
+            host_buckets[host] = TokenBucket(rate) if rate else None
+
+        return host_buckets[host]
+
+def throttle(url: str) -> None:
+    """Blocks until a request to the url's host fits within its rate limit."""
+    bucket = get_bucket(url)
+    if bucket is not None:
+        bucket.acquire()
+
+async def throttle_async(url: str) -> None:
+    bucket = get_bucket(url)
+    if bucket is not None:
+        await bucket.acquire_async()
+
+def pause_host(url: str, seconds: float) -> None:
+    bucket = get_bucket(url)
+    if bucket is not None:
+        bucket.pause(seconds)
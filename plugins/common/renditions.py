@@ -0,0 +1,80 @@
+import json
+import math
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+LAYOUTS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'assets', 'layouts.json')
+
+# Card sizes in layouts.json are in pixels at this density
+LAYOUTS_PPI = 300
+
+DEFAULT_CARD_SIZE = 'standard'
+DEFAULT_PPI = 300
+
+# Widths that Next.js image endpoints accept by default, smallest first
+NEXT_IMAGE_WIDTHS = [640, 750, 828, 1080, 1200, 1920, 2048, 3840]
+
+class RenditionSettings(BaseModel):
+    card_size: str = DEFAULT_CARD_SIZE
+    ppi: int = DEFAULT_PPI
+
+rendition_settings = RenditionSettings()
+
+# layouts.json does not change during a run, so it is only read once
+@lru_cache(maxsize=None)
+def load_card_sizes() -> Dict[str, Tuple[int, int]]:
+    with open(LAYOUTS_PATH, 'r', encoding='utf-8') as f:
+        layouts = json.load(f)
+
+    return {card_size: (size['width'], size['height']) for card_size, size in layouts['card_sizes'].items()}
+
+def configure_renditions(card_size: str = DEFAULT_CARD_SIZE, ppi: int = DEFAULT_PPI) -> None:
+    global rendition_settings
+    rendition_settings = RenditionSettings(card_size=card_size, ppi=ppi)
+
+def get_required_size() -> Tuple[int, int]:
+    """Returns the pixel dimensions a card needs to print sharply, short side first."""
+    width, height = load_card_sizes()[rendition_settings.card_size]
+    scale = rendition_settings.ppi / LAYOUTS_PPI
+
+    return tuple(sorted((math.ceil(width * scale), math.ceil(height * scale))))
+
+def choose_rendition(renditions: List[Tuple[str, int, int]], available: Optional[List[str]] = None) -> str:
+    """
+    Returns the smallest rendition that covers the card at the configured size and ppi.
+
+    `renditions` are (name, width, height) from smallest to largest, and
+    `available` optionally limits them to the ones a card actually has. Falls
+    back to the largest rendition when none are big enough.
+    """
+    if available is not None:
+        renditions = [rendition for rendition in renditions if rendition[0] in available]
+
+    if len(renditions) == 0:
+        raise Exception('No image renditions available.')
+
+    # Compare short sides and long sides so landscape cards are handled too
+    required_short, required_long = get_required_size()
+    for name, width, height in renditions:
+        short, long = sorted((width, height))
+        if short >= required_short and long >= required_long:
+            return name
+
+    return renditions[-1][0]
+
+def choose_width(widths: List[int] = NEXT_IMAGE_WIDTHS) -> int:
+    """
+    Returns the smallest image width that covers the card's long side.
+
+    Used for servers that resize to a requested width. The long side is used
+    since the same width is requested for portrait and landscape cards.
+    """
+    _, required_long = get_required_size()
+    for width in widths:
+        if width >= required_long:
+            return width
+
+    return widths[-1]
@@ -0,0 +1,191 @@
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from threading import Condition, Lock
+from typing import Dict, Optional
+
+from requests import Response
+
+from .executor import get_host
+from .rate_limit import pause_host
+
+DEFAULT_RETRIES = 4
+BACKOFF_BASE = 1
+BACKOFF_MAX = 60
+
+# Responses that are likely to succeed if sent again later
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Consecutive failures after which a host is given a rest
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_COOLDOWN = 30
+
+# How often async requests look again at a circuit they are waiting on
+CIRCUIT_POLL_INTERVAL = 0.5
+
+class CircuitOpenError(Exception):
+    pass
+
+class CircuitBreaker:
+    """
+    Holds back requests to a host after repeated failures.
+
+    Each request counts at most one failure, however many times it is
+    retried. Once open, requests with retries left wait out the cooldown
+    instead of hammering the host, and requests without any fail straight
+    away. After the cooldown one request is let through, and the circuit
+    closes again if it succeeds, which also wakes the waiting requests.
+    """
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, cooldown: float = CIRCUIT_COOLDOWN):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.lock = Lock()
+        self.closed = Condition(self.lock)
+
+    def check(self, host: str) -> float:
+        """Returns 0 when a request may be sent, or the seconds left until the host may be tried again."""
+        with self.lock:
+            if self.opened_at is None:
+                return 0
+
+            remaining = self.opened_at + self.cooldown - time.monotonic()
+            if remaining > 0:
+                return remaining
+
+            # Let a single trial request through
+            self.opened_at = time.monotonic()
+            return 0
+
+    def is_open(self) -> bool:
+        with self.lock:
+            return self.opened_at is not None
+
+    def get_open_error(self, host: str, remaining: float) -> CircuitOpenError:
+        return CircuitOpenError(f'Skipping request to {host} for another {remaining:.0f}s after {self.failures} failures in a row')
+
+    def wait(self, timeout: float) -> None:
+        """Waits up to `timeout` seconds, returning early if the circuit closes."""
+        with self.closed:
+            self.closed.wait_for(lambda: self.opened_at is None, timeout)
+
+    async def wait_async(self, timeout: float) -> None:
+        deadline = time.monotonic() + timeout
+        while self.is_open():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+
+            await asyncio.sleep(min(remaining, CIRCUIT_POLL_INTERVAL))
+
+    def record_success(self) -> None:
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.closed.notify_all()
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+host_breakers: Dict[str, CircuitBreaker] = {}
+host_breakers_lock = Lock()
+
+def get_breaker(url: str) -> CircuitBreaker:
+    host = get_host(url)
+
+    with host_breakers_lock:
+        if host not in host_breakers:
+            host_breakers[host] = CircuitBreaker()
+
+        return host_breakers[host]
+
+def parse_retry_after(r: Response) -> Optional[float]:
+    """Returns the seconds a Retry-After header asks for, in either of its formats."""
+    retry_after = r.headers.get('retry-after')
+    if retry_after is None:
+        return None
+
+    try:
+        return max(0, float(retry_after))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return None
+
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+
+    return max(0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+def get_backoff(attempt: int) -> float:
+    # Full jitter keeps threads that failed together from retrying together
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+class RequestRetries:
+    """
+    Decides whether and when to send a request again, for `send_request` and the async engine.
+
+    Connection errors, timeouts, 429s and 5XXs are retried with jittered
+    exponential backoff, or after the server's Retry-After, which also holds
+    back other requests to the host. Each request counts one failure towards
+    its host's circuit breaker, however many times it is retried.
+    """
+
+    def __init__(self, url: str, retries: int):
+        self.url = url
+        self.host = get_host(url)
+        self.breaker = get_breaker(url)
+        self.retries = retries
+        self.attempt = 0
+        self.failure_recorded = False
+
+    def get_circuit_wait(self) -> float:
+        """
+        Returns 0 when the request may be sent, or how long to wait for its host to recover.
+
+        Waiting uses up an attempt. Raises CircuitOpenError when no attempts are left.
+        """
+        wait = self.breaker.check(self.host)
+        if wait > 0:
+            if self.attempt >= self.retries:
+                raise self.breaker.get_open_error(self.host, wait)
+
+            # Spend an attempt waiting for the host to recover, rather than failing the request
+            print(f'Waiting up to {wait:.0f}s for {self.host} to recover before retrying {self.url}')
+            self.attempt += 1
+
+        return wait
+
+    def record_success(self) -> None:
+        # Any response other than a retried one means the host is up
+        self.breaker.record_success()
+
+    def get_retry_delay(self, reason: str, status: Optional[int] = None, retry_after: Optional[float] = None) -> Optional[float]:
+        """Records a failed attempt and returns how long to wait before the next one, or None to give up."""
+        if not self.failure_recorded:
+            self.breaker.record_failure()
+            self.failure_recorded = True
+
+        if self.attempt >= self.retries or (retry_after is not None and retry_after > BACKOFF_MAX):
+            return None
+
+        delay = retry_after if retry_after is not None else get_backoff(self.attempt)
+
+        # The whole host is overloaded, so slow down every request to it
+        if status == 429 or retry_after is not None:
+            pause_host(self.url, delay)
+
+        print(f'Retrying {self.url} in {delay:.1f}s: {reason}')
+        self.attempt += 1
+
+        return delay
@@ -13,8 +13,6 @@ def parse_deck_helper(
         is_card_line: Callable[[str], bool],
         extract_card_data: Callable[[str], card_data_tuple],
     ) -> None:
-    error_lines = []
-
     index = 0
 
     for line in deck_splitter(deck_text):
@@ -24,17 +22,10 @@ def parse_deck_helper(
             name, card_code, quantity = extract_card_data(line)
 
             print(f'Index: {index}, quantity: {quantity}, card code: {card_code}, name: {name}')
-            try:
-                handle_card(index, card_code, quantity)
-            except Exception as e:
-                print(f'Error: {e}')
-                error_lines.append((line, e))
+            handle_card(index, card_code, quantity)
         else:
             print(f'Skipping: "{line}"')
 
-    if len(error_lines) > 0:
-        print(f'Errors: {error_lines}')
-
 def parse_tts(deck_text: str, handle_card: Callable):
     pattern = compile(r'^([a-zA-Z0-9]+-\d+)$') # '{card code}'
 
@@ -1,28 +1,21 @@
 from os import path
-from requests import Response, get
-from time import sleep
+from requests import Response
+from plugins.common.http import request_get
+from plugins.common.library import request_card_art, save_card_art
 
 CARD_ART_URL_TEMPLATE = 'https://world.digimoncard.com/images/cardlist/card/{card_number}.png'
 
-def request_digimon(query: str) -> Response:
-    r = get(query, headers = {'user-agent': 'silhouette-card-maker/0.1', 'accept': '*/*'})
-
-    r.raise_for_status()
-    sleep(0.15)
-
-    return r
+def request_digimon(query: str, **kwargs) -> Response:
+    return request_get(query, **kwargs)
 
 def fetch_card_art(index: int, card_number: str, quantity: int, front_img_dir: str):
 
-    card_art = request_digimon(CARD_ART_URL_TEMPLATE.format(card_number=card_number)).content
+    card_art_path = request_card_art('digimon', CARD_ART_URL_TEMPLATE.format(card_number=card_number), request_digimon)
 
-    if card_art is not None:
+    if card_art_path is not None:
         # Save image based on quantity
-        for counter in range(quantity):
-            image_path = path.join(front_img_dir, f'{index}{card_number}_{counter + 1}.jpg')
-
-            with open(image_path, 'wb') as f:
-                f.write(card_art)
+        image_paths = [path.join(front_img_dir, f'{index}{card_number}_{counter + 1}.jpg') for counter in range(quantity)]
+        save_card_art(card_art_path, image_paths)
 
 def get_handle_card(
     front_img_dir: str
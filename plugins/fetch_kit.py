@@ -0,0 +1,138 @@
+import importlib
+import os
+import re
+import shlex
+from types import ModuleType
+from typing import Any, Dict, List, Tuple
+
+import click
+from click.core import ParameterSource
+
+from plugins.common.cli import FetchSettings, fetch_options, set_deck_options
+from plugins.common.executor import FetchExecutor
+from plugins.common.journal import set_journal_scope
+from plugins.common.manifest import add_manifest
+
+plugins_directory = os.path.dirname(os.path.abspath(__file__))
+games = sorted(game for game in os.listdir(plugins_directory) if os.path.isfile(os.path.join(plugins_directory, game, 'fetch.py')))
+
+def load_fetch_module(game: str) -> ModuleType:
+    # Plugins import their sibling modules through the plugins package, so games never share them
+    return importlib.import_module(f'plugins.{game}.fetch')
+
+def parse_kit(kit_path: str) -> List[Tuple[str, List[str]]]:
+    """
+    Returns the decks of a kit file with the arguments to fetch each one.
+
+    Each line is a deck path, its format and any of the plugin's own options.
+    Deck paths are relative to the kit file. Blank lines and lines starting
+    with # are ignored.
+    """
+    kit_directory = os.path.dirname(os.path.abspath(kit_path))
+
+    decks = []
+    with open(kit_path, 'r', encoding='utf-8') as kit_file:
+        for line in kit_file:
+            line = line.strip()
+            if line == '' or line.startswith('#'):
+                continue
+
+            deck_path, *arguments = shlex.split(line)
+            decks.append((os.path.join(kit_directory, deck_path), arguments))
+
+    return decks
+
+def get_deck_names(deck_paths: List[str]) -> List[str]:
+    # Decks with the same file name get numbered directories
+    names = []
+    for deck_path in deck_paths:
+        name = re.sub(r'[^\w\-]', '_', os.path.splitext(os.path.basename(deck_path))[0])
+
+        unique_name = name
+        counter = 2
+        while unique_name in names:
+            unique_name = f'{name}_{counter}'
+            counter += 1
+
+        names.append(unique_name)
+
+    return names
+
+def parse_deck_arguments(fetch_command: click.Command, game: str, deck_path: str, arguments: List[str]) -> Dict[str, Any]:
+    """Returns the plugin's own arguments for a deck line of a kit."""
+    with fetch_command.make_context(f'{game} {deck_path}', [deck_path, *arguments]) as ctx:
+        params = dict(ctx.params)
+
+    # Shared options apply to the whole kit
+    shared_options = [name for name in FetchSettings.model_fields if name in params and ctx.get_parameter_source(name) == ParameterSource.COMMANDLINE]
+    if len(shared_options) > 0:
+        raise click.UsageError(f'Set {", ".join(shared_options)} for the whole kit instead of for "{deck_path}".')
+
+    for name in FetchSettings.model_fields:
+        params.pop(name, None)
+
+    return params
+
+@click.command()
+@click.argument('game', type=click.Choice(games, case_sensitive=False))
+@click.argument('kit_path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--output_dir', default=os.path.join('game', 'kits'), type=click.Path(file_okay=False), show_default=True, help="The directory to create a directory for each deck in.")
+@click.option('--manifests', default=False, is_flag=True, help="Write a deck manifest for create_pdf.py --manifest in each deck's directory. Each card's art is saved once and its copies are recorded as a quantity.")
+@fetch_options(exclude=('front_dir', 'double_sided_dir', 'manifest'))
+
+def cli(game: str, kit_path: str, output_dir: str, manifests: bool, settings: FetchSettings):
+    """
+    Fetches every deck listed in KIT_PATH into its own directory.
+
+    All decks share one run, so each card is only looked up and downloaded
+    once however many decks it appears in.
+    """
+    fetch_module = load_fetch_module(game)
+
+    decks = parse_kit(kit_path)
+    deck_names = get_deck_names([deck_path for deck_path, _ in decks])
+
+    # Settings the game's plugin does not offer, such as --card_size for plugins with one image size
+    unused_settings = [name for name in FetchSettings.model_fields if name not in {param.name for param in fetch_module.cli.params}]
+
+    ctx = click.get_current_context()
+    unused_options = [name for name in unused_settings if ctx.get_parameter_source(name) == ParameterSource.COMMANDLINE]
+    if len(unused_options) > 0:
+        raise click.UsageError(f'The {game} plugin does not use {", ".join(unused_options)}.')
+
+    # Check every deck's options before fetching any of them
+    deck_params = [parse_deck_arguments(fetch_module.cli, game, deck_path, arguments) for deck_path, arguments in decks]
+
+    # Plugins that resolve cards in batches resolve the whole kit together
+    if hasattr(fetch_module, 'prepare_kit'):
+        fetch_module.prepare_kit(deck_params)
+
+    # Every deck's cards go to one executor, so the decks are fetched at the same time
+    with FetchExecutor(settings.workers) as executor:
+        for (deck_path, _), deck_name, params in zip(decks, deck_names, deck_params):
+            deck_directory = os.path.join(output_dir, deck_name)
+            deck_settings = settings.model_copy(update={
+                'front_dir': os.path.join(deck_directory, 'front'),
+                'double_sided_dir': os.path.join(deck_directory, 'double_sided'),
+                'manifest': os.path.join(deck_directory, 'manifest.json') if manifests else None,
+            })
+            os.makedirs(deck_settings.front_dir, exist_ok=True)
+            os.makedirs(deck_settings.double_sided_dir, exist_ok=True)
+
+            print(f'Fetching {deck_path} into {deck_directory}')
+
+            if deck_settings.manifest is not None:
+                add_manifest(deck_name, deck_settings.manifest, deck_settings.front_dir)
+
+            # Cards are keyed for --resume as they are submitted
+            executor.deck = deck_name
+            set_journal_scope(deck_name)
+            set_deck_options(params, deck_settings, unused_settings)
+
+            fetch_module.fetch_deck(executor, **params, settings=deck_settings)
+
+        executor.deck = ''
+        set_journal_scope('')
+
+if __name__ == '__main__':
+    cli()
@@ -11,8 +11,6 @@ class Pitch(str, Enum):
 card_data_tuple = Tuple[str, Pitch, int] # name, pitch, quantity
 
 def parse_deck_helper(deck_text: str, handle_card: Callable, is_card_line: Callable[[str], bool], extract_card_data: Callable[[str], card_data_tuple]) -> None:
-    error_lines = []
-
     index = 0
     for line in deck_text.strip().split('\n'):
         if is_card_line(line):
@@ -21,18 +19,11 @@ def parse_deck_helper(deck_text: str, handle_card: Callable, is_card_line: Calla
             name, pitch, quantity = extract_card_data(line)
 
             print(f'Index: {index}, quantity: {quantity}, name: {name}, pitch: {pitch.name.lower()}')
-            try:
-                handle_card(index, name, pitch, quantity)
-            except Exception as e:
-                print(f'Error: {e}')
-                error_lines.append((line, e))
+            handle_card(index, name, pitch, quantity)
 
         else:
             print(f'Skipping: "{line}"')
 
-    if len(error_lines) > 0:
-        print(f'Errors: {error_lines}')
-
 def parse_fabrary(deck_text: str, handle_card: Callable) -> None:
     pattern = compile(r'(\d+)x\s+([^(]+?)(?:\s+\((red|yellow|blue)\))?$') # '{quantity}x {name} {pitch?}' where pitch is optional
 
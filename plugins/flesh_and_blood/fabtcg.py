@@ -1,23 +1,17 @@
 from os import path
-from requests import Response, get
-from time import sleep
+from requests import Response
 from re import sub
-from deck_formats import Pitch
+from plugins.flesh_and_blood.deck_formats import Pitch
+from plugins.common.cache import request_json
+from plugins.common.http import request_get
+from plugins.common.library import request_card_art, save_card_art
 
 CARD_URL_TEMPLATE = 'https://cards.fabtcg.com/api/search/v1/cards/?name={card_name}{pitch}'
 
 OUTPUT_CARD_ART_FILE_TEMPLATE = '{deck_index}{card_name}{quantity_counter}.png'
 
-def request_fabtcg(query: str) -> Response:
-    r = get(query, headers = {'user-agent': 'silhouette-card-maker/0.1', 'accept': '*/*'})
-
-    # Check for 2XX response code
-    r.raise_for_status()
-
-    # Sleep for 150 milliseconds
-    sleep(0.15)
-
-    return r
+def request_fabtcg(query: str, **kwargs) -> Response:
+    return request_get(query, **kwargs)
 
 def fetch_card(
     index: int,
@@ -32,21 +26,15 @@ def fetch_card(
     pitch_argument = f'&pitch_lookup=exact&pitch={pitch.value}' if pitch != Pitch.NONE else ''
 
     url = CARD_URL_TEMPLATE.format(card_name=slugified,pitch=pitch_argument)
-    card_response = request_fabtcg(url)
-
-    card_art_url = card_response.json().get('results')[0].get('image').get('normal')
-    card_art_response = request_fabtcg(card_art_url)
-
-    if card_art_response is not None:
-        card_art = card_art_response.content
+    card_json = request_json(url)
 
-        if card_art is not None:
-            # Save image based on quantity
-            for counter in range(quantity):
-                image_path = path.join(front_img_dir, OUTPUT_CARD_ART_FILE_TEMPLATE.format(deck_index=str(index), card_name=sanitized, quantity_counter=str(counter+1)))
+    card_art_url = card_json.get('results')[0].get('image').get('normal')
+    card_art_path = request_card_art('flesh_and_blood', card_art_url, request_fabtcg)
 
-                with open(image_path, 'wb') as f:
-                    f.write(card_art)
+    if card_art_path is not None:
+        # Save image based on quantity
+        image_paths = [path.join(front_img_dir, OUTPUT_CARD_ART_FILE_TEMPLATE.format(deck_index=str(index), card_name=sanitized, quantity_counter=str(counter+1))) for counter in range(quantity)]
+        save_card_art(card_art_path, image_paths)
 
 def get_handle_card(
     front_img_dir: str,
@@ -1,17 +1,12 @@
 from os import path
 from click import command, argument, Choice
 
-from deck_formats import DeckFormat, parse_deck
-from fabtcg  import get_handle_card
+from plugins.flesh_and_blood.deck_formats import DeckFormat, parse_deck
+from plugins.flesh_and_blood.fabtcg import get_handle_card
+from plugins.common.cli import FetchSettings, fetch_options
+from plugins.common.executor import FetchExecutor
 
-front_directory = path.join('game', 'front')
-double_sided_directory = path.join('game', 'double_sided')
-
-@command()
-@argument('deck_path')
-@argument('format', type=Choice([t.value for t in DeckFormat], case_sensitive=False))
-
-def cli(deck_path: str, format: DeckFormat):
+def fetch_deck(executor: FetchExecutor, deck_path: str, format: DeckFormat, settings: FetchSettings):
     if not path.isfile(deck_path):
         print(f'{deck_path} is not a valid file.')
         return
@@ -19,7 +14,16 @@ def cli(deck_path: str, format: DeckFormat):
     with open(deck_path, 'r', encoding='utf-8') as deck_file:
         deck_text = deck_file.read()
 
-        parse_deck(deck_text, format, get_handle_card(front_directory))
+    parse_deck(deck_text, format, executor.wrap(get_handle_card(settings.front_dir)))
+
+@command()
+@argument('deck_path')
+@argument('format', type=Choice([t.value for t in DeckFormat], case_sensitive=False))
+@fetch_options(exclude=('card_size', 'ppi'))
+
+def cli(deck_path: str, format: DeckFormat, settings: FetchSettings):
+    with FetchExecutor(settings.workers) as executor:
+        fetch_deck(executor, deck_path, format, settings)
 
 if __name__ == '__main__':
     cli()
\ No newline at end of file
@@ -1,20 +1,17 @@
 from re import sub
 from os import path
-from requests import Response, get
-from time import sleep
+from requests import Response
+from plugins.common.cache import request_json
+from plugins.common.http import request_get
+from plugins.common.library import request_card_art, save_card_art
 
 CARD_URL_TEMPLATE = 'https://api.gatcg.com/cards/{name}'
 CARD_ART_URL_TEMPLATE = 'https://api.gatcg.com/{card_art_suffix}'
 
 OUTPUT_CARD_ART_FILE_TEMPLATE = '{deck_index}{card_name}{quantity_counter}.png'
 
-def request_gatcg(query: str) -> Response:
-    r = get(query, headers = {'user-agent': 'silhouette-card-maker/0.1', 'accept': '*/*'})
-
-    r.raise_for_status()
-    sleep(0.15)
-
-    return r
+def request_gatcg(query: str, **kwargs) -> Response:
+    return request_get(query, **kwargs)
 
 def fetch_card(
     index: int,
@@ -25,21 +22,15 @@ def fetch_card(
     # Query for card info    
     sanitized = sub(r'[^A-Za-z0-9 \-]+', '', card_name)
     slugified = sub(r'\s+', '-', sanitized).lower()
-    name_response = request_gatcg(CARD_URL_TEMPLATE.format(name=slugified))
+    name_json = request_json(CARD_URL_TEMPLATE.format(name=slugified))
 
-    card_art_url = name_response.json().get('editions', [{}])[0].get('image')
-    art_response = request_gatcg(CARD_ART_URL_TEMPLATE.format(card_art_suffix=card_art_url))
+    card_art_url = name_json.get('editions', [{}])[0].get('image')
+    card_art_path = request_card_art('grand_archive', CARD_ART_URL_TEMPLATE.format(card_art_suffix=card_art_url), request_gatcg)
     
-    if art_response is not None:
-        card_art = art_response.content
-
-        if card_art is not None:
-            # Save image based on quantity
-            for counter in range(quantity):
-                image_path = path.join(front_img_dir, OUTPUT_CARD_ART_FILE_TEMPLATE.format(deck_index=str(index), card_name=card_name, quantity_counter=str(counter + 1)))
-
-                with open(image_path, 'wb') as f:
-                    f.write(card_art)
+    if card_art_path is not None:
+        # Save image based on quantity
+        image_paths = [path.join(front_img_dir, OUTPUT_CARD_ART_FILE_TEMPLATE.format(deck_index=str(index), card_name=card_name, quantity_counter=str(counter + 1))) for counter in range(quantity)]
+        save_card_art(card_art_path, image_paths)
 
 def get_handle_card(
     front_img_dir: str,
@@ -1,18 +1,14 @@
 from os import path
-from requests import Response, get
-from time import sleep
+from requests import Response
+from plugins.common.http import request_get
+from plugins.common.library import request_card_art, save_card_art
 
 CARD_ART_URL_TEMPLATE = 'https://www.gundam-gcg.com/en/images/cards/card/{card_number}.webp'
 
 OUTPUT_CARD_ART_FILE_TEMPLATE = '{deck_index}{card_number}{quantity_counter}.png'
 
-def request_bandai(query: str) -> Response:
-    r = get(query, headers = {'user-agent': 'silhouette-card-maker/0.1', 'accept': '*/*'})
-
-    r.raise_for_status()
-    sleep(0.15)
-
-    return r
+def request_bandai(query: str, **kwargs) -> Response:
+    return request_get(query, **kwargs)
 
 def fetch_card(
     index: int,
@@ -21,15 +17,12 @@ def fetch_card(
     front_img_dir: str,
 ):
     # Query for card info
-    card_art = request_bandai(CARD_ART_URL_TEMPLATE.format(card_number=card_number)).content
+    card_art_path = request_card_art('gundam', CARD_ART_URL_TEMPLATE.format(card_number=card_number), request_bandai)
     
-    if card_art is not None:
+    if card_art_path is not None:
         # Save image based on quantity
-        for counter in range(quantity):
-            image_path = path.join(front_img_dir, OUTPUT_CARD_ART_FILE_TEMPLATE.format(deck_index=str(index), card_number=card_number, quantity_counter=str(counter + 1)))
-
-            with open(image_path, 'wb') as f:
-                f.write(card_art)
+        image_paths = [path.join(front_img_dir, OUTPUT_CARD_ART_FILE_TEMPLATE.format(deck_index=str(index), card_number=card_number, quantity_counter=str(counter + 1))) for counter in range(quantity)]
+        save_card_art(card_art_path, image_paths)
 
 def get_handle_card(
     front_img_dir: str,
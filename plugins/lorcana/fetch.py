@@ -1,18 +1,17 @@
 import os
 
 import click
-from deck_formats import DeckFormat, parse_deck
-from lorcast import get_handle_card
 
-front_directory = os.path.join('game', 'front')
+from plugins.lorcana.deck_formats import DeckFormat, parse_deck
+from plugins.lorcana.lorcast import get_handle_card
+from plugins.common.cli import FetchSettings, fetch_options
+from plugins.common.executor import FetchExecutor
 
-@click.command()
-@click.argument('deck_path')
-@click.argument('format', type=click.Choice([t.value for t in DeckFormat], case_sensitive=False))
-
-def cli(
+def fetch_deck(
+    executor: FetchExecutor,
     deck_path: str,
     format: DeckFormat,
+    settings: FetchSettings,
 ):
     if not os.path.isfile(deck_path):
         print(f'{deck_path} is not a valid file.')
@@ -21,13 +20,26 @@ def cli(
     with open(deck_path, 'r') as deck_file:
         deck_text = deck_file.read()
 
-        parse_deck(
-            deck_text,
-            format,
-            get_handle_card(
-                front_directory
-            )
-        )
+    parse_deck(
+        deck_text,
+        format,
+        executor.wrap(get_handle_card(
+            settings.front_dir
+        ))
+    )
+
+@click.command()
+@click.argument('deck_path')
+@click.argument('format', type=click.Choice([t.value for t in DeckFormat], case_sensitive=False))
+@fetch_options
+
+def cli(
+    deck_path: str,
+    format: DeckFormat,
+    settings: FetchSettings,
+):
+    with FetchExecutor(settings.workers) as executor:
+        fetch_deck(executor, deck_path, format, settings)
 
 if __name__ == '__main__':
     cli()
\ No newline at end of file
@@ -1,23 +1,32 @@
 import os
 import re
 import requests
-import time
 from io import BytesIO
 
 from PIL import Image
+from plugins.common.cache import request_json
+from plugins.common.http import request_get
+from plugins.common.library import request_card_art, save_card_art
+from plugins.common.renditions import choose_rendition
+
+# Lorcast image sizes from smallest to largest, with their pixel dimensions
+IMAGE_SIZES = [
+    ('small', 200, 279),
+    ('normal', 488, 681),
+    ('large', 1468, 2048),
+]
 
 def request_lorcast(
     query: str,
+    **kwargs
 ) -> requests.Response:
-    r = requests.get(query, headers = {'user-agent': 'silhouette-card-maker/0.1', 'accept': '*/*'})
+    return request_get(query, **kwargs)
 
-    # Check for 2XX response code
-    r.raise_for_status()
+def convert_to_png(content: bytes) -> bytes:
+    png = BytesIO()
+    Image.open(BytesIO(content)).save(png, format="PNG")
 
-    # Sleep for 150 milliseconds, greater than the 100ms requested by Lorcast API documentation
-    time.sleep(0.15)
-
-    return r
+    return png.getvalue()
 
 def format_lorcast_query(name: str, enchanted: bool) -> str:
     return re.sub(r'[^\w]', '+', name) + "+" + enchanted*"rarity:enchanted"
@@ -39,28 +48,22 @@ def fetch_card(
     card_info_query = f'https://api.lorcast.com/v0/cards/search?q={card_query}'
 
     # Query for card info
-    card_json = request_lorcast(card_info_query).json()['results'][0]
+    card_json = request_json(card_info_query)['results'][0]
 
     image_uris = card_json['image_uris']['digital']
     
-    card_front_image_url = ''
-    if 'large' in image_uris:
-        card_front_image_url = image_uris['large']
-    elif 'medium' in image_uris:
-        card_front_image_url = image_uris['medium']
-    elif 'small' in image_uris:
-        card_front_image_url = image_uris['small']
-    else:
+    if not any(size in image_uris for size, _, _ in IMAGE_SIZES):
         raise Exception(f'No images available for "{name}"')
 
-    card_art = Image.open(BytesIO(request_lorcast(card_front_image_url).content))
+    # Take the smallest image that is sharp enough for the card size and ppi
+    card_front_image_url = image_uris[choose_rendition(IMAGE_SIZES, available=list(image_uris))]
 
-    if card_art is not None:
-        # Save image based on quantity
-        for counter in range(quantity):
-            image_path = os.path.join(front_img_dir, f'{str(index)}{clean_card_name}{str(counter + 1)}.png')
+    card_art_path = request_card_art('lorcana', card_front_image_url, request_lorcast, version='png', convert=convert_to_png)
 
-            card_art.save(image_path, format="PNG")
+    if card_art_path is not None:
+        # Save image based on quantity
+        image_paths = [os.path.join(front_img_dir, f'{str(index)}{clean_card_name}{str(counter + 1)}.png') for counter in range(quantity)]
+        save_card_art(card_art_path, image_paths)
 
 def get_handle_card(
     front_img_dir: str,
@@ -0,0 +1,278 @@
+import json
+import os
+import re
+import sqlite3
+from threading import local
+from typing import Dict, Iterator, List, Optional, TextIO
+
+from plugins.common.cache import request_json
+from plugins.common.http import request_get
+
+BULK_DATA_URL = 'https://api.scryfall.com/bulk-data/default-cards'
+DEFAULT_INDEX_PATH = os.path.join('game', 'cache', 'scryfall', 'default_cards.sqlite3')
+
+# Only the fields used to resolve and filter printings are kept in the index
+CARD_FIELDS = [
+    'id', 'oracle_id', 'name', 'lang', 'layout', 'set', 'collector_number', 'released_at',
+    'nonfoil', 'digital', 'promo', 'frame_effects', 'full_art', 'border_color',
+    'image_uris', 'card_faces',
+]
+CARD_FACE_FIELDS = ['name', 'oracle_id', 'image_uris']
+
+INDEX_BATCH_SIZE = 1000
+
+# Bumped when the tables change, so that older indexes are rebuilt
+INDEX_SCHEMA_VERSION = '2'
+
+# Layouts that share names with playable cards but are not the card itself
+NON_PLAYABLE_LAYOUTS = ('art_series', 'token', 'double_faced_token', 'emblem')
+
+def normalize_name(name: str) -> str:
+    # Matches how card names are cleaned before querying the Scryfall API
+    return re.sub(r'[^\w]', '', name).lower()
+
+def iter_json_array(f: TextIO, chunk_size: int = 1 << 20) -> Iterator[dict]:
+    """
+    Yields the items of a JSON array one at a time without loading the whole file.
+
+    Bulk data files are hundreds of megabytes, so only one chunk of text and
+    one decoded card are held in memory at a time.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    started = False
+    eof = False
+
+    while True:
+        # Skip whitespace and separators between items
+        while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] == ','):
+            pos = pos + 1
+
+        if pos < len(buffer):
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError('Bulk data is not a JSON array')
+
+                started = True
+                pos = pos + 1
+                continue
+
+            if buffer[pos] == ']':
+                return
+
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+                yield item
+                continue
+            except json.JSONDecodeError:
+                # The item continues in the next chunk, unless the file has ended
+                if eof:
+                    raise
+
+        elif eof:
+            raise ValueError('Bulk data ended before the end of the JSON array')
+
+        chunk = f.read(chunk_size)
+        eof = chunk == ''
+        buffer = buffer[pos:] + chunk
+        pos = 0
+
+def compact_card(card: dict) -> dict:
+    compact = {field: card[field] for field in CARD_FIELDS if field in card}
+
+    if 'card_faces' in compact:
+        compact['card_faces'] = [{field: face[field] for field in CARD_FACE_FIELDS if field in face} for face in compact['card_faces']]
+
+    # Reversible cards only have oracle ids on their faces
+    if 'oracle_id' not in compact and len(compact.get('card_faces', [])) > 0:
+        compact['oracle_id'] = compact['card_faces'][0].get('oracle_id')
+
+    return compact
+
+def build_index(dump_path: str, index_path: str = DEFAULT_INDEX_PATH, updated_at: str = '') -> None:
+    """Streams a Scryfall default_cards dump into an SQLite index."""
+    os.makedirs(os.path.dirname(index_path) or '.', exist_ok=True)
+
+    # Build next to the old index and swap it in once complete
+    temp_index_path = f'{index_path}.{os.getpid()}.tmp'
+    if os.path.exists(temp_index_path):
+        os.remove(temp_index_path)
+
+    connection = sqlite3.connect(temp_index_path)
+    try:
+        connection.executescript('''
+            CREATE TABLE cards (
+                id TEXT PRIMARY KEY,
+                oracle_id TEXT,
+                set_code TEXT,
+                collector_number TEXT,
+                released_at TEXT,
+                digital INTEGER,
+                playable INTEGER,
+                data TEXT
+            );
+            CREATE TABLE names (name TEXT, card_id TEXT);
+            CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT);
+        ''')
+
+        num_cards = 0
+        card_rows = []
+        name_rows = []
+
+        def flush():
+            connection.executemany('INSERT OR REPLACE INTO cards VALUES (?, ?, ?, ?, ?, ?, ?, ?)', card_rows)
+            connection.executemany('INSERT INTO names VALUES (?, ?)', name_rows)
+            card_rows.clear()
+            name_rows.clear()
+
+        with open(dump_path, 'r', encoding='utf-8') as f:
+            for card in iter_json_array(f):
+                card = compact_card(card)
+
+                card_rows.append((
+                    card['id'],
+                    card.get('oracle_id'),
+                    card['set'].lower(),
+                    card['collector_number'],
+                    card.get('released_at', ''),
+                    int(card.get('digital', False)),
+                    int(card.get('layout') not in NON_PLAYABLE_LAYOUTS),
+                    json.dumps(card, separators=(',', ':'))
+                ))
+
+                # Multi-faced cards can be looked up by their full name or any face name
+                names = {normalize_name(card['name'])}
+                names.update(normalize_name(face['name']) for face in card.get('card_faces', []) if 'name' in face)
+                name_rows.extend((name, card['id']) for name in names)
+
+                num_cards = num_cards + 1
+                if len(card_rows) >= INDEX_BATCH_SIZE:
+                    flush()
+
+        flush()
+
+        connection.executescript('''
+            CREATE INDEX cards_by_number ON cards (set_code, collector_number);
+            CREATE INDEX cards_by_oracle_id ON cards (oracle_id, released_at);
+            CREATE INDEX names_by_name ON names (name);
+        ''')
+        connection.executemany('INSERT INTO metadata VALUES (?, ?)', [
+            ('updated_at', updated_at),
+            ('source', os.path.abspath(dump_path)),
+            ('schema_version', INDEX_SCHEMA_VERSION),
+        ])
+        connection.commit()
+    finally:
+        connection.close()
+
+    os.replace(temp_index_path, index_path)
+    print(f'Indexed {num_cards} cards from Scryfall bulk data: {index_path}')
+
+def read_index_updated_at(index_path: str) -> Optional[str]:
+    if not os.path.isfile(index_path):
+        return None
+
+    connection = sqlite3.connect(f'file:{index_path}?mode=ro', uri=True)
+    try:
+        metadata = dict(connection.execute("SELECT key, value FROM metadata WHERE key IN ('updated_at', 'schema_version')").fetchall())
+    except sqlite3.Error:
+        return None
+    finally:
+        connection.close()
+
+    # Indexes built with older tables count as out of date
+    if metadata.get('schema_version') != INDEX_SCHEMA_VERSION:
+        return None
+
+    return metadata.get('updated_at')
+
+def update_index(index_path: str = DEFAULT_INDEX_PATH) -> None:
+    """Downloads the latest default_cards dump when the index is missing or out of date."""
+    bulk_data_json = request_json(BULK_DATA_URL)
+    updated_at = bulk_data_json['updated_at']
+
+    if read_index_updated_at(index_path) == updated_at:
+        return
+
+    print(f'Downloading Scryfall bulk data ({bulk_data_json.get("size", 0) / 1e6:.0f} MB)')
+
+    os.makedirs(os.path.dirname(index_path) or '.', exist_ok=True)
+    dump_path = f'{index_path}.{os.getpid()}.json'
+    try:
+        r = request_get(bulk_data_json['download_uri'], stream=True)
+        with open(dump_path, 'wb') as f:
+            for chunk in r.iter_content(chunk_size=1 << 20):
+                f.write(chunk)
+
+        build_index(dump_path, index_path, updated_at)
+    finally:
+        if os.path.exists(dump_path):
+            os.remove(dump_path)
+
+class BulkDataIndex:
+    """
+    Resolves cards and printings from a local index instead of the Scryfall API.
+
+    Cards are returned in the same shape as the API, limited to the fields
+    in CARD_FIELDS, so they can be used interchangeably.
+    """
+
+    def __init__(self, index_path: str = DEFAULT_INDEX_PATH):
+        if not os.path.isfile(index_path):
+            raise Exception(f'Scryfall bulk data index "{index_path}" does not exist.')
+
+        self.index_path = index_path
+        self.connections = local()
+
+    def get_connection(self) -> sqlite3.Connection:
+        # SQLite connections cannot be shared between the fetch threads
+        connection = getattr(self.connections, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(f'file:{self.index_path}?mode=ro', uri=True)
+            self.connections.connection = connection
+
+        return connection
+
+    def find_by_number(self, card_set: str, collector_number: str) -> Optional[Dict]:
+        row = self.get_connection().execute(
+            'SELECT data FROM cards WHERE set_code = ? AND collector_number = ?',
+            (card_set.lower(), str(collector_number))
+        ).fetchone()
+
+        return json.loads(row[0]) if row is not None else None
+
+    def find_by_name(self, name: str) -> Optional[Dict]:
+        # Like the API, prefer the most recent paper printing of the playable card over
+        # art series cards, tokens and emblems that share its name
+        row = self.get_connection().execute(
+            '''
+            SELECT cards.data FROM names JOIN cards ON cards.id = names.card_id
+            WHERE names.name = ?
+            ORDER BY cards.playable DESC, cards.digital, cards.released_at DESC
+            LIMIT 1
+            ''',
+            (normalize_name(name),)
+        ).fetchone()
+
+        return json.loads(row[0]) if row is not None else None
+
+    def find_printings(self, oracle_id: str) -> List[Dict]:
+        # Newest printings first, the same order as the API's prints search
+        rows = self.get_connection().execute(
+            'SELECT data FROM cards WHERE oracle_id = ? ORDER BY released_at DESC',
+            (oracle_id,)
+        ).fetchall()
+
+        return [json.loads(row[0]) for row in rows]
+
+def open_bulk_data_index(bulk_data_file: Optional[str] = None, index_path: str = DEFAULT_INDEX_PATH) -> BulkDataIndex:
+    if bulk_data_file is not None:
+        # Only rebuild when the dump has changed since the index was built
+        updated_at = f'{os.path.abspath(bulk_data_file)}@{os.path.getmtime(bulk_data_file)}'
+        if read_index_updated_at(index_path) != updated_at:
+            build_index(bulk_data_file, index_path, updated_at)
+    else:
+        update_index(index_path)
+
+    return BulkDataIndex(index_path)
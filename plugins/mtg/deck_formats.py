@@ -7,8 +7,6 @@ from typing import Callable, Tuple
 card_data_tuple = Tuple[str, str, int, int]
 
 def parse_deck_helper(deck_text: str, is_card_line: Callable[[str], bool], extract_card_data: Callable[[str], card_data_tuple], handle_card: Callable) -> None:
-    error_lines = []
-
     index = 0
     for line in deck_text.strip().split('\n'):
         if is_card_line(line):
@@ -17,18 +15,11 @@ def parse_deck_helper(deck_text: str, is_card_line: Callable[[str], bool], extra
             name, set_code, collector_number, quantity = extract_card_data(line)
 
             print(f'Index: {index}, quantity: {quantity}, set code: {set_code}, collector number: {collector_number}, name: {name}')
-            try:
-                handle_card(index, name, set_code, collector_number, quantity)
-            except Exception as e:
-                print(f'Error: {e}')
-                error_lines.append((line, e))
+            handle_card(index, name, set_code, collector_number, quantity)
 
         else:
             print(f'Skipping: "{line}"')
 
-    if len(error_lines) > 0:
-        print(f'Errors: {error_lines}')
-
 # Isshin, Two Heavens as One
 # Arid Mesa
 # Battlefield Forge
@@ -1,13 +1,125 @@
 import os
 
 import click
-from deck_formats import DeckFormat, parse_deck
-from scryfall import get_handle_card
 
-from typing import Set
+from plugins.mtg.deck_formats import DeckFormat, parse_deck
+from plugins.mtg.scryfall import IMAGE_VERSIONS, fetch_card_collection, get_handle_card
+from plugins.mtg.bulk_data import BulkDataIndex, open_bulk_data_index
+from plugins.common.cli import FetchSettings, fetch_options
+from plugins.common.executor import FetchExecutor
+from plugins.common.journal import find_completed, get_card_key
+from plugins.common.renditions import choose_rendition
 
-front_directory = os.path.join('game', 'front')
-double_sided_directory = os.path.join('game', 'double_sided')
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+def read_deck_cards(deck_path: str, format: DeckFormat) -> Optional[List[tuple]]:
+    if not os.path.isfile(deck_path):
+        print(f'{deck_path} is not a valid file.')
+        return None
+
+    with open(deck_path, 'r') as deck_file:
+        deck_text = deck_file.read()
+
+    # Parse the whole deck first so that cards can be resolved in batches
+    deck_cards = []
+    parse_deck(deck_text, format, lambda *args: deck_cards.append(args))
+
+    return deck_cards
+
+@lru_cache(maxsize=None)
+def get_bulk_index(bulk_data: bool, bulk_data_file: Optional[str]) -> Optional[BulkDataIndex]:
+    if bulk_data or bulk_data_file is not None:
+        return open_bulk_data_index(bulk_data_file)
+
+    return None
+
+def get_collection_identifiers(deck_cards: List[tuple], bulk_index: Optional[BulkDataIndex]) -> List[Tuple[str, str]]:
+    # Cards in the local index or skipped by a resumed run do not need resolving
+    return [
+        (card_set, card_collector_number)
+        for card_args in deck_cards
+        for _, _, card_set, card_collector_number, _ in [card_args]
+        if card_set and card_collector_number
+        and (bulk_index is None or bulk_index.find_by_number(card_set, card_collector_number) is None)
+        and find_completed(get_card_key(list(card_args))) is None
+    ]
+
+def resolve_collection(identifiers: List[Tuple[str, str]]) -> Dict[Tuple[str, str], dict]:
+    if len(identifiers) == 0:
+        return {}
+
+    try:
+        return fetch_card_collection(identifiers)
+    except Exception as e:
+        print(f'Error: Could not resolve cards in batches, resolving them one at a time instead: {e}')
+        return {}
+
+def prepare_kit(deck_params: List[Dict[str, Any]]) -> None:
+    """
+    Resolves the cards of every deck in a kit before any deck is fetched.
+
+    Called by fetch_kit.py, so that the whole kit is resolved in one set of
+    collection batches, and each deck then finds its cards already resolved.
+    The decks' journal keys are only set as they are fetched, so cards that
+    a resumed kit skips are resolved here all the same.
+    """
+    identifiers = []
+    for params in deck_params:
+        if params['ignore_set_and_collector_number']:
+            continue
+
+        deck_cards = read_deck_cards(params['deck_path'], params['format'])
+        if deck_cards is not None:
+            identifiers.extend(get_collection_identifiers(deck_cards, get_bulk_index(params['bulk_data'], params['bulk_data_file'])))
+
+    resolve_collection(identifiers)
+
+def fetch_deck(
+    executor: FetchExecutor,
+    deck_path: str,
+    format: DeckFormat,
+    ignore_set_and_collector_number: bool,
+    prefer_older_sets: bool,
+    prefer_set: Set[str],
+
+    prefer_showcase: bool,
+    prefer_extra_art: bool,
+
+    bulk_data: bool,
+    bulk_data_file: str,
+
+    settings: FetchSettings
+):
+    deck_cards = read_deck_cards(deck_path, format)
+    if deck_cards is None:
+        return
+
+    bulk_index = get_bulk_index(bulk_data, bulk_data_file)
+
+    known_cards = {}
+    if not ignore_set_and_collector_number:
+        known_cards = resolve_collection(get_collection_identifiers(deck_cards, bulk_index))
+
+    handle_card = executor.wrap(get_handle_card(
+        ignore_set_and_collector_number,
+
+        prefer_older_sets,
+        prefer_set,
+
+        prefer_showcase,
+        prefer_extra_art,
+
+        settings.front_dir,
+        settings.double_sided_dir,
+
+        bulk_index,
+        known_cards,
+        choose_rendition(IMAGE_VERSIONS)
+    ))
+
+    for card_args in deck_cards:
+        handle_card(*card_args)
 
 @click.command()
 @click.argument('deck_path')
@@ -17,6 +129,9 @@ double_sided_directory = os.path.join('game', 'double_sided')
 @click.option('-s', '--prefer_set', multiple=True, help="Prefer fetching cards from a particular set(s) if sets are not provided. Use this option multiple times to specify multiple preferred sets.")
 @click.option('--prefer_showcase', default=False, is_flag=True, show_default=True, help="Prefer fetching cards with showcase treatment")
 @click.option('--prefer_extra_art', default=False, is_flag=True, show_default=True, help="Prefer fetching cards with full art, borderless, or extended art.")
+@click.option('--bulk_data', default=False, is_flag=True, show_default=True, help="Resolve cards and printings from a local index of Scryfall's bulk data instead of the API. The bulk data is downloaded when the index is missing or out of date.")
+@click.option('--bulk_data_file', type=click.Path(exists=True, dir_okay=False), help="Build the local index from a downloaded Scryfall default cards file. Implies --bulk_data.")
+@fetch_options
 
 def cli(
     deck_path: str,
@@ -26,30 +141,26 @@ def cli(
     prefer_set: Set[str],
 
     prefer_showcase: bool,
-    prefer_extra_art: bool
-):
-    if not os.path.isfile(deck_path):
-        print(f'{deck_path} is not a valid file.')
-        return
+    prefer_extra_art: bool,
 
-    with open(deck_path, 'r') as deck_file:
-        deck_text = deck_file.read()
+    bulk_data: bool,
+    bulk_data_file: str,
 
-        parse_deck(
-            deck_text,
+    settings: FetchSettings
+):
+    with FetchExecutor(settings.workers) as executor:
+        fetch_deck(
+            executor,
+            deck_path,
             format,
-            get_handle_card(
-                ignore_set_and_collector_number,
-
-                prefer_older_sets,
-                prefer_set,
-                
-                prefer_showcase,
-                prefer_extra_art,
-
-                front_directory,
-                double_sided_directory
-            )
+            ignore_set_and_collector_number,
+            prefer_older_sets,
+            prefer_set,
+            prefer_showcase,
+            prefer_extra_art,
+            bulk_data,
+            bulk_data_file,
+            settings
         )
 
 if __name__ == '__main__':
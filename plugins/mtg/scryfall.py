@@ -1,60 +1,134 @@
 import os
-from typing import List, Set, Tuple
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
 import re
 import requests
-import time
+from plugins.common.cache import cached, request_json
+from plugins.common.http import request_get, request_post
+from plugins.common.library import request_card_art, save_card_art
+from plugins.mtg.bulk_data import BulkDataIndex, compact_card
 
 double_sided_layouts = ['transform', 'modal_dfc']
 
+# Maximum number of identifiers per request to the collection endpoint
+COLLECTION_BATCH_SIZE = 75
+
+# Scryfall image versions from smallest to largest, with their pixel dimensions
+IMAGE_VERSIONS = [
+    ('normal', 488, 680),
+    ('large', 672, 936),
+    ('png', 745, 1040),
+]
+
 def request_scryfall(
     query: str,
+    **kwargs
 ) -> requests.Response:
-    r = requests.get(query, headers = {'user-agent': 'silhouette-card-maker/0.1', 'accept': '*/*'})
+    return request_get(query, **kwargs)
+
+# Collection results of this run, with None for pairs that Scryfall could not find,
+# so decks fetched together never look the same card up twice
+collection_cards: Dict[Tuple[str, str], Optional[dict]] = {}
+
+def fetch_card_collection(identifiers: List[Tuple[str, str]]) -> Dict[Tuple[str, str], dict]:
+    """
+    Resolves (set, collector number) pairs in batches through the collection endpoint.
+
+    Returns the cards keyed by their lowercase set code and collector number.
+    Pairs that Scryfall could not find are left out. Pairs resolved earlier in
+    the run are not sent again.
+    """
+    unique_identifiers = list(dict.fromkeys((card_set.lower(), str(card_collector_number)) for card_set, card_collector_number in identifiers))
+    new_identifiers = [identifier for identifier in unique_identifiers if identifier not in collection_cards]
+
+    for start in range(0, len(new_identifiers), COLLECTION_BATCH_SIZE):
+        batch = new_identifiers[start:start + COLLECTION_BATCH_SIZE]
+
+        collection_json = request_post(
+            'https://api.scryfall.com/cards/collection',
+            json={'identifiers': [{'set': card_set, 'collector_number': card_collector_number} for card_set, card_collector_number in batch]}
+        ).json()
 
-    # Check for 2XX response code
-    r.raise_for_status()
+        for identifier in batch:
+            collection_cards.setdefault(identifier, None)
 
-    # Sleep for 150 milliseconds, greater than the 100ms requested by Scryfall API documentation
-    time.sleep(0.15)
+        for card_json in collection_json['data']:
+            collection_cards[(card_json['set'].lower(), card_json['collector_number'])] = card_json
 
-    return r
+    cards = {identifier: collection_cards[identifier] for identifier in unique_identifiers if collection_cards[identifier] is not None}
+
+    if len(new_identifiers) > 0:
+        print(f'Resolved {len(cards)} of {len(unique_identifiers)} cards by set and collector number in {-(-len(new_identifiers) // COLLECTION_BATCH_SIZE)} request(s)')
+
+    return cards
+
+def get_image_urls(card_json: dict, image_version: str) -> List[str]:
+    """
+    Returns the art urls of the faces that get printed, front first.
+
+    The urls come from the card's own `image_uris`, so no further API requests
+    are needed. Cards without them fall back to the API's image redirect.
+    """
+    layout = card_json.get('layout')
+
+    # Double-faced cards only have images on their faces
+    if 'image_uris' in card_json:
+        faces = [card_json['image_uris']]
+    else:
+        faces = [face['image_uris'] for face in card_json.get('card_faces', []) if 'image_uris' in face]
+
+    if layout not in double_sided_layouts:
+        faces = faces[:1]
+
+    if len(faces) > 0 and all(image_version in face for face in faces):
+        return [face[image_version] for face in faces]
+
+    card_front_image_query = f'https://api.scryfall.com/cards/{card_json["set"]}/{card_json["collector_number"]}/?format=image&version={image_version}'
+    if layout in double_sided_layouts:
+        return [card_front_image_query, f'{card_front_image_query}&face=back']
+
+    return [card_front_image_query]
+
+def get_image_extension(url: str, image_version: str) -> str:
+    extension = os.path.splitext(urlparse(url).path)[1]
+    if extension != '':
+        return extension
+
+    return '.png' if image_version == 'png' else '.jpg'
 
 def fetch_card_art(
     index: int,
     quantity: int,
 
     clean_card_name: str,
-    card_set: int,
-    card_collector_number: int,
-    layout: str,
+    card_json: dict,
+    image_version: str,
 
     front_img_dir: str,
     double_sided_dir: str
 ) -> None:
+    image_urls = get_image_urls(card_json, image_version)
+
     # Query for the front side
-    card_front_image_query = f'https://api.scryfall.com/cards/{card_set}/{card_collector_number}/?format=image&version=png'
-    card_art = request_scryfall(card_front_image_query).content
-    if card_art is not None:
+    card_front_image_query = image_urls[0]
+    card_art_path = request_card_art('mtg', card_front_image_query, request_scryfall)
+    if card_art_path is not None:
 
         # Save image based on quantity
-        for counter in range(quantity):
-            image_path = os.path.join(front_img_dir, f'{str(index)}{clean_card_name}{str(counter + 1)}.png')
-
-            with open(image_path, 'wb') as f:
-                f.write(card_art)
+        extension = get_image_extension(card_front_image_query, image_version)
+        front_image_paths = [os.path.join(front_img_dir, f'{str(index)}{clean_card_name}{str(counter + 1)}{extension}') for counter in range(quantity)]
+        save_card_art(card_art_path, front_image_paths)
 
     # Get backside of card, if it exists
-    if layout in double_sided_layouts:
-        card_back_image_query = f'{card_front_image_query}&face=back'
-        card_art = request_scryfall(card_back_image_query).content
-        if card_art is not None:
+    if len(image_urls) > 1:
+        card_back_image_query = image_urls[1]
+        card_art_path = request_card_art('mtg', card_back_image_query, request_scryfall)
+        if card_art_path is not None:
 
             # Save image based on quantity
-            for counter in range(quantity):
-                image_path = os.path.join(double_sided_dir, f'{str(index)}{clean_card_name}{str(counter + 1)}.png')
-
-                with open(image_path, 'wb') as f:
-                    f.write(card_art)
+            extension = get_image_extension(card_back_image_query, image_version)
+            back_image_paths = [os.path.join(double_sided_dir, f'{str(index)}{clean_card_name}{str(counter + 1)}{extension}') for counter in range(quantity)]
+            save_card_art(card_art_path, back_image_paths, back_of=front_image_paths)
 
 def remove_nonalphanumeric(s: str) -> str:
     return re.sub(r'[^\w]', '', s)
@@ -86,6 +160,65 @@ def filtering(printings: List, filters):
 
     return pool
 
+def get_card_by_number(card_set: str, card_collector_number: str, bulk_index: Optional[BulkDataIndex], known_cards: Dict[Tuple[str, str], dict]) -> dict:
+    card_json = known_cards.get((card_set.lower(), str(card_collector_number)))
+    if card_json is not None:
+        return card_json
+
+    if bulk_index is not None:
+        card_json = bulk_index.find_by_number(card_set, card_collector_number)
+        if card_json is not None:
+            return card_json
+
+    return request_json(f"https://api.scryfall.com/cards/{card_set}/{card_collector_number}")
+
+def get_card_by_name(clear_card_name: str, bulk_index: Optional[BulkDataIndex]) -> dict:
+    if bulk_index is not None:
+        card_json = bulk_index.find_by_name(clear_card_name)
+        if card_json is not None:
+            return card_json
+
+    return request_json(f'https://api.scryfall.com/cards/named?exact={clear_card_name}')
+
+def get_card_printings(card_json: dict, bulk_index: Optional[BulkDataIndex]) -> List:
+    if bulk_index is not None and card_json.get('oracle_id') is not None:
+        card_printings = bulk_index.find_printings(card_json['oracle_id'])
+        if len(card_printings) > 0:
+            return card_printings
+
+    # Cards from the local index without an oracle id have no other known printings
+    if 'prints_search_uri' not in card_json:
+        return [card_json]
+
+    return fetch_all_printings(card_json)
+
+def fetch_all_printings(card_json: dict) -> List:
+    """
+    Returns every printing of a card, following the search's pagination.
+
+    The full list is cached per oracle id, keeping only the fields used to
+    filter printings and download their art, so repeat runs need no requests.
+    """
+    oracle_id = card_json.get('oracle_id') or compact_card(card_json).get('oracle_id')
+    prints_search_uri = card_json['prints_search_uri']
+
+    def fetch_pages() -> List:
+        printings = []
+
+        query = prints_search_uri
+        while query is not None:
+            page_json = request_json(query)
+            printings.extend(compact_card(printing) for printing in page_json['data'])
+
+            query = page_json.get('next_page') if page_json.get('has_more') else None
+
+        return printings
+
+    key = f'scryfall:printings:{oracle_id}' if oracle_id is not None else f'scryfall:printings:{prints_search_uri}'
+
+    # Callers reorder the list, so hand out a copy of the cached value
+    return list(cached(key, fetch_pages))
+
 def fetch_card(
     index: int,
     quantity: int,
@@ -103,15 +236,17 @@ def fetch_card(
     prefer_extra_art: bool,
 
     front_img_dir: str,
-    double_sided_dir: str
+    double_sided_dir: str,
+
+    bulk_index: Optional[BulkDataIndex] = None,
+    known_cards: Dict[Tuple[str, str], dict] = {},
+    image_version: str = 'png'
 ):
     if not ignore_set_and_collector_number and card_set != "" and card_collector_number != "":
-        card_info_query = f"https://api.scryfall.com/cards/{card_set}/{card_collector_number}"
-
         # Query for card info
-        card_json = request_scryfall(card_info_query).json()
+        card_json = get_card_by_number(card_set, card_collector_number, bulk_index, known_cards)
 
-        fetch_card_art(index, quantity, remove_nonalphanumeric(card_json['name']), card_set, card_collector_number, card_json['layout'], front_img_dir, double_sided_dir)
+        fetch_card_art(index, quantity, remove_nonalphanumeric(card_json['name']), card_json, image_version, front_img_dir, double_sided_dir)
 
     else:
         if name == "":
@@ -120,19 +255,14 @@ def fetch_card(
         # Filter out symbols from card names
         clear_card_name = remove_nonalphanumeric(name)
 
-        card_info_query = f'https://api.scryfall.com/cards/named?exact={clear_card_name}'
-
         # Query for card info
-        card_json = request_scryfall(card_info_query).json()
-
-        set = card_json["set"]
-        collector_number = card_json["collector_number"]
+        card_json = get_card_by_name(clear_card_name, bulk_index)
+        printing_json = card_json
 
         # If preferred options are used, then filter over prints
         if prefer_older_sets or len(preferred_sets) > 0 or prefer_showcase or prefer_extra_art:
             # Get available printings
-            prints_search_json = request_scryfall(card_json['prints_search_uri']).json()
-            card_printings = prints_search_json['data']
+            card_printings = get_card_printings(card_json, bulk_index)
 
             # Optional reverse for older preferences
             if prefer_older_sets:
@@ -154,18 +284,15 @@ def fetch_card(
             if len(filtered_printings) == 0:
                 print(f'No printings found for "{name}" with preferred options. Using default instead.')
             else:
-                best_print = filtered_printings[0]
-                set = best_print["set"]
-                collector_number = best_print["collector_number"]
+                printing_json = filtered_printings[0]
 
         # Fetch card art
         fetch_card_art(
             index,
             quantity,
             clear_card_name,
-            set,
-            collector_number,
-            card_json['layout'],
+            printing_json,
+            image_version,
             front_img_dir,
             double_sided_dir
         )
@@ -180,7 +307,11 @@ def get_handle_card(
     prefer_extra_art: bool,
 
     front_img_dir: str,
-    double_sided_dir: str
+    double_sided_dir: str,
+
+    bulk_index: Optional[BulkDataIndex] = None,
+    known_cards: Dict[Tuple[str, str], dict] = {},
+    image_version: str = 'png'
 ):
     def configured_fetch_card(index: int, name: str, card_set: str = None, card_collector_number: int = None, quantity: int = 1):
         fetch_card(
@@ -200,6 +331,10 @@ def get_handle_card(
             prefer_extra_art,
 
             front_img_dir,
-            double_sided_dir
+            double_sided_dir,
+
+            bulk_index,
+            known_cards,
+            image_version
         )
     return configured_fetch_card
\ No newline at end of file
@@ -5,8 +5,6 @@ from typing import Callable, Tuple
 card_data_tuple = Tuple[str, int, str] # card number, quantity, name
 
 def parse_deck_helper(deck_text: str, handle_card: Callable, is_card_line: Callable[[str], bool], extract_card_data: Callable[[str], card_data_tuple]) -> None:
-    error_lines = []
-
     index = 0
     for line in deck_text.strip().split('\n'):
         if is_card_line(line):
@@ -15,18 +13,11 @@ def parse_deck_helper(deck_text: str, handle_card: Callable, is_card_line: Calla
             card_code, quantity, name = extract_card_data(line)
 
             print(f'Index: {index}, quantity: {quantity}, card code: {card_code}, name: {name}')
-            try:
-                handle_card(index, card_code, quantity)
-            except Exception as e:
-                print(f'Error: {e}')
-                error_lines.append((line, e))
+            handle_card(index, card_code, quantity)
 
         else:
             print(f'Skipping: "{line}"')
 
-    if len(error_lines) > 0:
-        print(f'Errors: {error_lines}')
-
 def parse_optcgsim(deck_text: str, handle_card: Callable) -> None:
     pattern = compile(r'^(\d{1})x([A-Z0-9]+-\d+)$') # '{quantity}x{card number}'
 
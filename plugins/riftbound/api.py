@@ -1,76 +1,81 @@
 from os import path
-from re import compile, search, sub
+from re import compile
 from enum import Enum
-import time
+from typing import List, Optional
 import requests
-
-PILTOVER_URL_TEMPLATE = 'https://piltoverarchive.com/_next/image?url=https://cdn.piltoverarchive.com/cards/{card_number}.webp&w=1920&q=75'
+from plugins.common.cache import request_json
+from plugins.common.http import request_get
+from plugins.common.library import save_card_art
+from plugins.common.mirrors import request_card_art_from_mirrors
+from plugins.common.renditions import choose_width
+from plugins.riftbound.card_index import get_card_number_index, normalize_name, parse_card_title
+
+PILTOVER_URL_TEMPLATE = 'https://piltoverarchive.com/_next/image?url=https://cdn.piltoverarchive.com/cards/{card_number}.webp&w={width}&q=75'
 RIFTMANA_URL_TEMPLATE = 'https://riftmana.com/wp-content/uploads/Cards/{card_number}.webp'
 
 class ImageServer(str, Enum):
     PILTOVER = 'piltover_archive'
     RIFTMANA = 'riftmana'
 
-def request_api(query: str) -> requests.Response:
-    r = requests.get(query, headers = {'user-agent': 'silhouette-card-maker/0.1', 'accept': '*/*'})
-    r.raise_for_status()
-    time.sleep(0.15)
+IMAGE_URL_TEMPLATES = {
+    ImageServer.PILTOVER: PILTOVER_URL_TEMPLATE,
+    ImageServer.RIFTMANA: RIFTMANA_URL_TEMPLATE,
+}
+
+ALTERNATE_ART_SUFFIX_PATTERN = compile(r'^([A-Z0-9]+-\d+)a$')
 
-    return r
+def request_api(query: str, **kwargs) -> requests.Response:
+    return request_get(query, **kwargs)
 
-def fetch_card_art(index: int, card_number: str, quantity: int, source: ImageServer, front_img_dir: str):
-    url_template = PILTOVER_URL_TEMPLATE
-    if source == ImageServer.RIFTMANA:
-        url_template = RIFTMANA_URL_TEMPLATE
+def get_card_art_urls(card_number: str, source: ImageServer) -> List[List[str]]:
+    """Returns the art urls for a card on every image server, the preferred server first."""
+    card_numbers = [card_number]
 
-    image_server_query = url_template.format(card_number=card_number)
-    api_response = request_api(image_server_query)
+    # Alternate arts that are missing fall back to the signature art of the card
+    match = ALTERNATE_ART_SUFFIX_PATTERN.match(card_number)
+    if match:
+        card_numbers.append(f'{match.group(1)}s')
 
-    # Otherwise, try to retrieve the art for the signature art of the card since the request failed for alternate art
-    if api_response is None:
-        alternate_art_suffix_pattern = compile(r'^([A-Z0-9]+-\d+)a$')
-        match = search(alternate_art_suffix_pattern, card_number)
-        if match:
-            image_server_query = url_template.format(card_number=f'{match.group(1)}s')
-            api_response = request_api(image_server_query)
+    # Piltover Archive resizes to the requested width, so ask for just enough for the card size and ppi
+    width = choose_width()
 
-    if api_response is not None:
-        card_art = api_response.content
+    servers = [source, *[server for server in ImageServer if server != source]]
+    return [[IMAGE_URL_TEMPLATES[server].format(card_number=number, width=width) for server in servers] for number in card_numbers]
 
-        if card_art is not None:
-            # Save image based on quantity
-            for counter in range(quantity):
-                image_path = path.join(front_img_dir, f'{index}{card_number}_{counter + 1}.jpg')
+def fetch_card_art(index: int, card_number: str, quantity: int, source: ImageServer, hedge_after: Optional[float], front_img_dir: str):
+    card_art_path = request_card_art_from_mirrors('riftbound', get_card_art_urls(card_number, ImageServer(source)), request_api, hedge_after)
 
-                with open(image_path, 'wb') as f:
-                    f.write(card_art)
+    # Save image based on quantity
+    image_paths = [path.join(front_img_dir, f'{index}{card_number}_{counter + 1}.jpg') for counter in range(quantity)]
+    save_card_art(card_art_path, image_paths)
 
 def fetch_card_number(name: str) -> str:
-    # Edge case of cards that are misnamed on the backend
-    if name == "Spirit's Refuge":
-        name = "Spirit's Rifuge"
+    # Most names resolve from the local index without any requests
+    card_number_index = get_card_number_index()
+    card_number = card_number_index.find(name)
+    if card_number is not None:
+        return card_number
 
     # Get the internal information based on the card name to route to the card itself
-    sanitized = sub(r'[^A-Za-z0-9 \-]+', '', name)
-    slugified = sub(r'\s+', '-', sanitized).lower()
+    slugified = normalize_name(name)
 
     url = f"https://riftmana.com/wp-json/wp/v2/card-name?search={slugified}"
-    name_response = request_api(url)
+    name_json = request_json(url)
 
     # Now we can retrieve the card number
-    card_link = name_response.json()[0].get('_links', {}).get('wp:post_type')[0].get('href')
-    card_response = request_api(card_link)
-    card_number_and_name = card_response.json()[0].get('title').get('rendered')
+    card_link = name_json[0].get('_links', {}).get('wp:post_type')[0].get('href')
+    card_json = request_json(card_link)
+    parsed = parse_card_title(card_json[0].get('title').get('rendered'))
 
-    # '{Card Number} {Card Name}'
-    pattern = compile(r'^([A-Z0-9]+-\d+[a-z]?)(\s+|-)(.*)$')
-    match = pattern.match(card_number_and_name)
+    if parsed is not None:
+        card_number, _ = parsed
+        card_number_index.remember(name, card_number)
 
-    if match:
-        return match.group(1).strip()
+        return card_number
 
 def get_handle_card(
     source: ImageServer,
+    hedge_after: Optional[float],
     front_img_dir: str
 ):
     def configured_fetch_card(index: int, card_number: str, quantity: int):
@@ -79,6 +84,7 @@ def get_handle_card(
             card_number,
             quantity,
             source,
+            hedge_after,
             front_img_dir
         )
 
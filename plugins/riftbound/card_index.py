@@ -0,0 +1,190 @@
+import json
+import os
+import time
+from concurrent.futures import Future
+from html import unescape
+from re import compile, sub
+from threading import Lock, get_ident
+from typing import Dict, Optional
+
+from plugins.common.cache import is_cache_enabled
+from plugins.common.http import request_get
+
+DEFAULT_INDEX_PATH = os.path.join('game', 'cache', 'riftbound', 'card_numbers.json')
+
+# The listing is fetched again after this long to pick up new sets
+LISTING_TTL_SECONDS = 7 * 24 * 60 * 60
+
+CARDS_LISTING_URL = 'https://riftmana.com/wp-json/wp/v2/cards?per_page=100&page={page}'
+
+# Cards that are misnamed on the backend
+NAME_ALIASES = {
+    "Spirit's Refuge": "Spirit's Rifuge",
+}
+
+# '{Card Number} {Card Name}'
+CARD_TITLE_PATTERN = compile(r'^([A-Z0-9]+-\d+[a-z]?)(\s+|-)(.*)$')
+
+def normalize_name(name: str) -> str:
+    name = NAME_ALIASES.get(name, name)
+    name = unescape(name).replace('’', "'")
+
+    sanitized = sub(r'[^A-Za-z0-9 \-]+', '', name)
+    return sub(r'\s+', '-', sanitized.strip()).lower()
+
+def parse_card_title(title: str) -> Optional[tuple]:
+    """Splits a riftmana post title into its card number and card name."""
+    match = CARD_TITLE_PATTERN.match(unescape(title).strip())
+    if match is None:
+        return None
+
+    return match.group(1).strip(), match.group(3).strip()
+
+def is_base_card_number(card_number: str) -> bool:
+    # Alternate and signature arts add a letter to the card number
+    return not card_number[-1].isalpha()
+
+def add_card_number(card_numbers: Dict[str, str], key: str, card_number: str) -> None:
+    # Prefer the base printing when a name has several card numbers
+    existing = card_numbers.get(key)
+    if existing is None or (is_base_card_number(card_number) and not is_base_card_number(existing)):
+        card_numbers[key] = card_number
+
+def fetch_listing() -> Dict[str, str]:
+    """Returns the card numbers of every card in riftmana's paginated listing, keyed by normalized name."""
+    card_numbers = {}
+
+    page = 1
+    total_pages = 1
+    while page <= total_pages:
+        r = request_get(CARDS_LISTING_URL.format(page=page))
+        total_pages = int(r.headers.get('x-wp-totalpages', total_pages))
+
+        for card_json in r.json():
+            parsed = parse_card_title(card_json.get('title', {}).get('rendered', ''))
+            if parsed is not None:
+                card_number, name = parsed
+                add_card_number(card_numbers, normalize_name(name), card_number)
+
+        page += 1
+
+    return card_numbers
+
+class CardNumberIndex:
+    """
+    Resolves Riftbound card names to card numbers from a file on disk.
+
+    The index is filled from riftmana's paginated card listing and from past
+    lookups, so names in a deck usually resolve without any requests.
+    """
+
+    def __init__(self, index_path: str = DEFAULT_INDEX_PATH, persist: bool = True):
+        self.index_path = index_path
+        self.persist = persist
+        self.lock = Lock()
+        self.card_numbers: Dict[str, str] = {}
+        self.listed_at: float = 0
+        self.listing_failed = False
+
+        # Set while one thread fetches the listing, for the others to wait on
+        self.listing: Optional[Future] = None
+
+        if not persist:
+            return
+
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                index_json = json.load(f)
+
+            self.card_numbers = index_json.get('card_numbers', {})
+            self.listed_at = index_json.get('listed_at', 0)
+        except (OSError, ValueError):
+            pass
+
+    def save(self) -> None:
+        if not self.persist:
+            return
+
+        os.makedirs(os.path.dirname(self.index_path) or '.', exist_ok=True)
+
+        temp_path = f'{self.index_path}.{os.getpid()}.{get_ident()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'listed_at': self.listed_at, 'card_numbers': self.card_numbers}, f, indent=1, sort_keys=True)
+
+        os.replace(temp_path, self.index_path)
+
+    def add(self, name: str, card_number: str) -> None:
+        add_card_number(self.card_numbers, normalize_name(name), card_number)
+
+    def refresh_listing(self, listing: Future) -> None:
+        """Fills the index from every page of the card listing, without holding the lock while fetching."""
+        try:
+            card_numbers = fetch_listing()
+        except Exception as e:
+            # Fall back to looking up cards one at a time
+            with self.lock:
+                self.listing_failed = True
+
+            print(f'Could not index Riftbound card names: {e}')
+        else:
+            with self.lock:
+                for key, card_number in card_numbers.items():
+                    add_card_number(self.card_numbers, key, card_number)
+
+                self.listed_at = time.time()
+                print(f'Indexed {len(self.card_numbers)} Riftbound card names')
+
+                try:
+                    self.save()
+                except OSError as e:
+                    print(f'Could not save the Riftbound card index: {e}')
+        finally:
+            with self.lock:
+                self.listing = None
+
+            listing.set_result(None)
+
+    def find(self, name: str) -> Optional[str]:
+        key = normalize_name(name)
+
+        with self.lock:
+            if key in self.card_numbers or time.time() - self.listed_at <= LISTING_TTL_SECONDS or self.listing_failed:
+                return self.card_numbers.get(key)
+
+            # Only one thread fetches the listing, and the others wait for it
+            listing = self.listing
+            if listing is None:
+                listing = self.listing = Future()
+                fetching = True
+            else:
+                fetching = False
+
+        if fetching:
+            self.refresh_listing(listing)
+        else:
+            listing.result()
+
+        with self.lock:
+            return self.card_numbers.get(key)
+
+    def remember(self, name: str, card_number: str) -> None:
+        with self.lock:
+            self.add(name, card_number)
+
+            try:
+                self.save()
+            except OSError as e:
+                print(f'Could not save the Riftbound card index: {e}')
+
+card_number_index: Optional[CardNumberIndex] = None
+card_number_index_lock = Lock()
+
+def get_card_number_index() -> CardNumberIndex:
+    global card_number_index
+
+    with card_number_index_lock:
+        if card_number_index is None:
+            # With caching turned off, the index only lasts for this run
+            card_number_index = CardNumberIndex(persist=is_cache_enabled())
+
+        return card_number_index
@@ -4,7 +4,7 @@ from _collections_abc import Set
 from typing import Callable, Dict, Optional, Tuple
 from base64 import b64decode
 
-from api import fetch_card_number
+from plugins.riftbound.api import fetch_card_number
 
 card_data_tuple = Tuple[str, str, int] # Name, Card Number, Quantity
 def parse_deck_helper(
@@ -14,8 +14,6 @@ def parse_deck_helper(
         extract_card_data: Callable[[str], card_data_tuple],
         handle_card: Callable
     ) -> None:
-    error_lines = []
-
     index = 0
     for line in deck_splitter(deck_text):
         if is_card_line(line):
@@ -24,17 +22,10 @@ def parse_deck_helper(
             name, card_number, quantity = extract_card_data(line)
 
             print(f'Index: {index}, quantity: {quantity}, card number: {card_number}, name: {name}')
-            try:
-                handle_card(index, card_number, quantity)
-            except Exception as e:
-                print(f'Error: {e}')
-                error_lines.append((line, e))
+            handle_card(index, card_number, quantity)
         else:
             print(f'Skipping: "{line}"')
 
-    if len(error_lines) > 0:
-        print(f'Errors: {error_lines}')
-
 def parse_tts(deck_text: str, handle_card: Callable):
     pattern = compile(r'^([A-Z0-9]+)-(\d+[a-z]?)-(\d+)$') # '{Set ID}-{Card ID}-{Art Number}'
     alternate_art_suffix = 'a'
@@ -1,18 +1,13 @@
 from os import path
-from click import command, argument, option, Choice
+from typing import Optional
+from click import command, argument, option, Choice, FloatRange
 
-from deck_formats import DeckFormat, parse_deck
-from api import fetch_card_art, ImageServer, get_handle_card
+from plugins.riftbound.deck_formats import DeckFormat, parse_deck
+from plugins.riftbound.api import fetch_card_art, ImageServer, get_handle_card
+from plugins.common.cli import FetchSettings, fetch_options
+from plugins.common.executor import FetchExecutor
 
-front_directory = path.join('game', 'front')
-double_sided_directory = path.join('game', 'double_sided')
-
-@command()
-@argument('deck_path')
-@argument('format', type=Choice([t.value for t in DeckFormat], case_sensitive=False))
-@option("--source", default=ImageServer.PILTOVER.value, type=Choice([t.value for t in ImageServer], case_sensitive=False), show_default=True, help="The desired image source.")
-
-def cli(deck_path: str, format: DeckFormat, source: ImageServer):
+def fetch_deck(executor: FetchExecutor, deck_path: str, format: DeckFormat, source: ImageServer, hedge_after: Optional[float], settings: FetchSettings):
     if not path.isfile(deck_path):
         print(f'{deck_path} is not a valid file.')
         return
@@ -20,14 +15,26 @@ def cli(deck_path: str, format: DeckFormat, source: ImageServer):
     with open(deck_path, 'r') as deck_file:
         deck_text = deck_file.read()
 
-        parse_deck(
-            deck_text,
-            format,
-            get_handle_card(
-                source,
-                front_directory
-            )
-        )
+    parse_deck(
+        deck_text,
+        format,
+        executor.wrap(get_handle_card(
+            source,
+            hedge_after,
+            settings.front_dir
+        ))
+    )
+
+@command()
+@argument('deck_path')
+@argument('format', type=Choice([t.value for t in DeckFormat], case_sensitive=False))
+@option("--source", default=ImageServer.PILTOVER.value, type=Choice([t.value for t in ImageServer], case_sensitive=False), show_default=True, help="The desired image source. Cards that fail on it are fetched from the other source, which is also used first once it is much faster.")
+@option("--hedge_after", default=None, type=FloatRange(min=0, min_open=True), help="Also request a card's art from the other source when the first has not finished after this many seconds, and keep whichever finishes first.")
+@fetch_options
+
+def cli(deck_path: str, format: DeckFormat, source: ImageServer, hedge_after: Optional[float], settings: FetchSettings):
+    with FetchExecutor(settings.workers) as executor:
+        fetch_deck(executor, deck_path, format, source, hedge_after, settings)
 
 if __name__ == '__main__':
     cli()
\ No newline at end of file
@@ -1,17 +1,12 @@
 import os
 import click
 
-from deck_formats import DeckFormat, parse_deck
-from ygoprodeck import fetch_card_art
+from plugins.yugioh.deck_formats import DeckFormat, parse_deck
+from plugins.yugioh.ygoprodeck import fetch_card_art
+from plugins.common.cli import FetchSettings, fetch_options
+from plugins.common.executor import FetchExecutor
 
-front_directory = os.path.join('game', 'front')
-double_sided_directory = os.path.join('game', 'double_sided')
-
-@click.command()
-@click.argument('deck_path')
-@click.argument('format', type=click.Choice([t.value for t in DeckFormat], case_sensitive=False))
-
-def cli(deck_path: str, format: DeckFormat):
+def fetch_deck(executor: FetchExecutor, deck_path: str, format: DeckFormat, settings: FetchSettings):
     if format == DeckFormat.YDK and not os.path.isfile(deck_path):
         print(f'{deck_path} is not a valid file.')
         return
@@ -19,7 +14,16 @@ def cli(deck_path: str, format: DeckFormat):
     cards = parse_deck(deck_path, format)
 
     for passcode, quantity in cards.items():
-        fetch_card_art(passcode, quantity, front_directory)
+        executor.submit(f'{passcode}', fetch_card_art, passcode, quantity, settings.front_dir)
+
+@click.command()
+@click.argument('deck_path')
+@click.argument('format', type=click.Choice([t.value for t in DeckFormat], case_sensitive=False))
+@fetch_options(exclude=('card_size', 'ppi'))
+
+def cli(deck_path: str, format: DeckFormat, settings: FetchSettings):
+    with FetchExecutor(settings.workers) as executor:
+        fetch_deck(executor, deck_path, format, settings)
 
 if __name__ == '__main__':
     cli()
\ No newline at end of file
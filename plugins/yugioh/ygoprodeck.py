@@ -1,24 +1,17 @@
 import os
 import requests
-import time
+from plugins.common.http import request_get
+from plugins.common.library import request_card_art, save_card_art
 
-def request_api(query: str) -> requests.Response:
-    r = requests.get(query, headers = {'user-agent': 'silhouette-card-maker/0.1', 'accept': '*/*'})
-    r.raise_for_status()
-    time.sleep(0.15)
-
-    return r
+def request_api(query: str, **kwargs) -> requests.Response:
+    return request_get(query, **kwargs)
 
 def fetch_card_art(passcode: int, quantity: int, front_img_dir: str):
     card_front_image_query = f'https://images.ygoprodeck.com/images/cards/{passcode}.jpg'
-    card_art = request_api(card_front_image_query).content
-    if card_art is not None:
+    card_art_path = request_card_art('yugioh', card_front_image_query, request_api)
+    if card_art_path is not None:
 
         # Save image based on quantity
-        for counter in range(quantity):
-            image_path = os.path.join(front_img_dir, f'{passcode}_{counter + 1}.jpg')
-
-            with open(image_path, 'wb') as f:
-                f.write(card_art)
-
+        image_paths = [os.path.join(front_img_dir, f'{passcode}_{counter + 1}.jpg') for counter in range(quantity)]
+        for image_path in save_card_art(card_art_path, image_paths):
             print(f'{image_path}')
\ No newline at end of file
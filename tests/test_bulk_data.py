@@ -0,0 +1,65 @@
+import io
+import json
+import os
+import sqlite3
+
+import pytest
+
+from plugins.mtg.bulk_data import BulkDataIndex, build_index, iter_json_array, read_index_updated_at
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'scryfall_default_cards.json')
+
+@pytest.fixture
+def index_path(tmp_path):
+    path = str(tmp_path / 'default_cards.sqlite3')
+    build_index(FIXTURE_PATH, path, updated_at='fixture')
+    return path
+
+def test_iter_json_array_matches_json_load():
+    with open(FIXTURE_PATH, 'r', encoding='utf-8') as f:
+        expected = json.load(f)
+
+    # Small chunks split cards across reads
+    with open(FIXTURE_PATH, 'r', encoding='utf-8') as f:
+        assert list(iter_json_array(f, chunk_size=16)) == expected
+
+def test_iter_json_array_rejects_truncated_dump():
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO('[{"id": "a"}, {"id": "b"}')))
+
+def test_find_by_number(index_path):
+    card = BulkDataIndex(index_path).find_by_number('M10', '146')
+
+    assert card['id'] == 'bolt-m10'
+    # Only the fields needed for resolving cards are kept
+    assert 'prices' not in card
+
+def test_find_by_name_prefers_playable_paper_printing(index_path):
+    # The newer art series card and digital printing share the name
+    assert BulkDataIndex(index_path).find_by_name('Lightning Bolt')['id'] == 'bolt-2xm'
+
+def test_find_by_name_falls_back_to_tokens(index_path):
+    assert BulkDataIndex(index_path).find_by_name('Treasure')['id'] == 'treasure'
+
+def test_find_by_name_matches_faces(index_path):
+    index = BulkDataIndex(index_path)
+
+    assert index.find_by_name('Insectile Aberration')['id'] == 'delver'
+    assert index.find_by_name('Delver of Secrets // Insectile Aberration')['id'] == 'delver'
+    assert [face['name'] for face in index.find_by_name('Delver of Secrets')['card_faces']] == ['Delver of Secrets', 'Insectile Aberration']
+
+def test_find_printings_newest_first(index_path):
+    printings = BulkDataIndex(index_path).find_printings('o-bolt')
+
+    assert [card['id'] for card in printings] == ['bolt-sld', 'bolt-2xm', 'bolt-m10']
+
+def test_read_index_updated_at(index_path):
+    assert read_index_updated_at(index_path) == 'fixture'
+
+def test_read_index_updated_at_rebuilds_older_schemas(index_path):
+    connection = sqlite3.connect(index_path)
+    connection.execute("DELETE FROM metadata WHERE key = 'schema_version'")
+    connection.commit()
+    connection.close()
+
+    assert read_index_updated_at(index_path) is None
@@ -0,0 +1,53 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+
+from plugins.riftbound import card_index
+from plugins.riftbound.card_index import CardNumberIndex
+
+def test_find_answers_known_names_while_listing_is_fetched(monkeypatch):
+    fetching = Event()
+    release = Event()
+    calls = []
+
+    def fetch_listing():
+        calls.append(None)
+        fetching.set()
+        release.wait(5)
+        return {'other-card': 'OGN-101', 'some-card': 'OGN-100a'}
+
+    monkeypatch.setattr(card_index, 'fetch_listing', fetch_listing)
+
+    index = CardNumberIndex(persist=False)
+    index.remember('Some Card', 'OGN-100')
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        first = pool.submit(index.find, 'Other Card')
+        assert fetching.wait(5)
+
+        second = pool.submit(index.find, 'Other Card')
+
+        # Names already in the index do not wait for the listing
+        assert index.find('Some Card') == 'OGN-100'
+
+        release.set()
+        assert first.result(5) == 'OGN-101'
+        assert second.result(5) == 'OGN-101'
+
+    # The listing is fetched once, and keeps the base printing that was remembered
+    assert len(calls) == 1
+    assert index.find('Some Card') == 'OGN-100'
+
+def test_find_falls_back_after_listing_fails(monkeypatch):
+    calls = []
+
+    def fetch_listing():
+        calls.append(None)
+        raise OSError('offline')
+
+    monkeypatch.setattr(card_index, 'fetch_listing', fetch_listing)
+
+    index = CardNumberIndex(persist=False)
+
+    assert index.find('Some Card') is None
+    assert index.find('Other Card') is None
+    assert len(calls) == 1
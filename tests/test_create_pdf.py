@@ -0,0 +1,158 @@
+import os
+import re
+
+import pytest
+from click.testing import CliRunner
+from PIL import Image
+
+import create_pdf
+from utilities import CardLayoutSize, ImageFormat, ImageHeader, OutputTarget, check_image_headers, get_image_save_options, image_format_extensions, parse_crop_string, parse_output_string, save_outputs
+
+repository_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_create_pdf(tmp_path, *arguments):
+    result = CliRunner().invoke(create_pdf.cli, [
+        '--front_dir_path', str(tmp_path / 'front'),
+        '--back_dir_path', str(tmp_path / 'back'),
+        '--double_sided_dir_path', str(tmp_path / 'double_sided'),
+        '--output_images',
+        '--output_path', str(tmp_path / 'pages') + os.sep,
+        '--ppi', '30',
+        *arguments
+    ])
+    assert result.exit_code == 0, result.output
+
+    return result.output
+
+def make_directories(tmp_path):
+    for directory in ('front', 'back', 'double_sided', 'pages'):
+        (tmp_path / directory).mkdir()
+
+def test_reprint_keeps_original_page_numbers(tmp_path, monkeypatch):
+    # Layouts and assets are found relative to the repository
+    monkeypatch.chdir(repository_directory)
+    make_directories(tmp_path)
+
+    for index in range(20):
+        Image.new('RGB', (60, 84), (index * 10, 0, 0)).save(tmp_path / 'front' / f'card{index:02}.png')
+
+    run_create_pdf(tmp_path)
+    assert sorted(os.listdir(tmp_path / 'pages')) == [f'page{number}.png' for number in range(1, 7)]
+
+    full_run_pages = os.listdir(tmp_path / 'pages')
+    for name in full_run_pages:
+        os.utime(tmp_path / 'pages' / name, (0, 0))
+
+    # Sheet 3 is written over its own pages, and the other sheets are left alone
+    run_create_pdf(tmp_path, '--sheets', '3')
+    assert sorted(os.listdir(tmp_path / 'pages')) == [f'page{number}.png' for number in range(1, 7)]
+
+    rewritten = sorted(name for name in full_run_pages if os.path.getmtime(tmp_path / 'pages' / name) != 0)
+    assert rewritten == ['page5.png', 'page6.png']
+
+# A poker card with 0.125in of bleed on every side, at 300 ppi
+BLEED_CARD_HEADER = ImageHeader(format='PNG', mode='RGB', width=825, height=1125, orientation=1)
+
+def test_preflight_crops_horizontal_cards_along_the_layout_axes():
+    # Horizontal layouts are landscape, and the portrait card images are rotated into them
+    card_layout_size = CardLayoutSize(width=1050, height=750)
+    crop = parse_crop_string('0.125in', card_layout_size.width, card_layout_size.height)
+
+    problems = check_image_headers(['card.png'], {'card.png': BLEED_CARD_HEADER}, {}, None, card_layout_size, crop, True)
+    assert problems == []
+
+def test_plan_reports_source_ppi_of_horizontal_cards(tmp_path, monkeypatch):
+    monkeypatch.chdir(repository_directory)
+    make_directories(tmp_path)
+
+    Image.new('RGB', (BLEED_CARD_HEADER.width, BLEED_CARD_HEADER.height)).save(tmp_path / 'front' / 'card.png')
+
+    output = run_create_pdf(tmp_path, '--plan', '--card_orientation', 'horizontal', '--crop', '0.125in', '--only_fronts')
+
+    # The bleed is cropped from the card's own sides, leaving close to 300 ppi on both axes
+    assert 'resolution: 298-298 ppi' in output
+
+def test_parse_output_string():
+    assert parse_output_string('game.pdf', 300) == OutputTarget(path='game.pdf', ppi=300)
+    assert parse_output_string('game.pdf@600', 300) == OutputTarget(path='game.pdf', ppi=600)
+    assert parse_output_string('previews', 300) == OutputTarget(path='previews', ppi=300, image_format=ImageFormat.PNG)
+    assert parse_output_string('previews/@72:JPEG', 300) == OutputTarget(path='previews/', ppi=72, image_format=ImageFormat.JPEG)
+
+    # An @ inside the path is not read as a ppi
+    assert parse_output_string('me@home/game.pdf', 300) == OutputTarget(path='me@home/game.pdf', ppi=300)
+
+@pytest.mark.parametrize('output_string', ['previews:bmp', 'game.pdf:png', 'previews@abc:png', 'game.pdf@0', 'game.pdf@'])
+def test_parse_output_string_rejects_bad_outputs(output_string):
+    with pytest.raises(ValueError):
+        parse_output_string(output_string, 300)
+
+@pytest.mark.parametrize('image_format', list(ImageFormat))
+def test_image_formats_save_and_reopen(tmp_path, image_format):
+    path = tmp_path / f'page1.{image_format_extensions[image_format]}'
+    Image.new('RGB', (40, 20), (200, 100, 0)).save(path, **get_image_save_options(image_format, 90, 72))
+
+    with Image.open(path) as image:
+        assert image.format == image_format.name
+        assert image.mode == 'RGB'
+        assert image.size == (40, 20)
+
+        # WebP has nowhere to store the resolution
+        if image_format != ImageFormat.WEBP:
+            assert round(image.info['dpi'][0]) == 72
+
+        if image_format == ImageFormat.TIFF:
+            assert image.info['compression'] == 'tiff_adobe_deflate'
+
+def test_save_outputs_downsamples_each_target(tmp_path):
+    pages = [Image.new('RGB', (200, 100), (index * 100, 0, 0)) for index in range(2)]
+    output_targets = [
+        OutputTarget(path=str(tmp_path / 'game.pdf'), ppi=100),
+        OutputTarget(path=str(tmp_path / 'previews'), ppi=50, image_format=ImageFormat.JPEG),
+        OutputTarget(path=str(tmp_path / 'full'), ppi=100, image_format=ImageFormat.PNG),
+    ]
+
+    save_outputs(pages, [1, 2], output_targets, 100, 90)
+
+    assert sorted(os.listdir(tmp_path / 'previews')) == ['page1.jpg', 'page2.jpg']
+    with Image.open(tmp_path / 'previews' / 'page2.jpg') as image:
+        assert image.size == (100, 50)
+
+    assert sorted(os.listdir(tmp_path / 'full')) == ['page1.png', 'page2.png']
+    with Image.open(tmp_path / 'full' / 'page1.png') as image:
+        assert image.size == (200, 100)
+
+    # Appending a page adds a new page tree, and the last one counts every page
+    assert re.findall(rb'/Count (\d+)', (tmp_path / 'game.pdf').read_bytes())[-1] == b'2'
+
+def test_output_image_directory_is_created(tmp_path, monkeypatch):
+    monkeypatch.chdir(repository_directory)
+    make_directories(tmp_path)
+
+    Image.new('RGB', (60, 84)).save(tmp_path / 'front' / 'card.png')
+
+    # No trailing separator, and the directory does not exist yet
+    run_create_pdf(tmp_path, '--output', str(tmp_path / 'previews') + '@15:jpeg', '--only_fronts')
+    assert os.listdir(tmp_path / 'previews') == ['page1.jpg']
+
+def test_plan_matches_rendered_sheets(tmp_path, monkeypatch):
+    monkeypatch.chdir(repository_directory)
+    make_directories(tmp_path)
+
+    for index in range(14):
+        Image.new('RGB', (60, 84), (index * 10, 0, 0)).save(tmp_path / 'front' / f'card{index:02}.png')
+    for index in (3, 9):
+        Image.new('RGB', (60, 84), (0, index * 10, 0)).save(tmp_path / 'double_sided' / f'card{index:02}.png')
+
+    plan_output = run_create_pdf(tmp_path, '--plan', '--skip', '0', '--skip', '4')
+    planned = []
+    for line in plan_output.splitlines():
+        sheet_match = re.fullmatch(r'Sheet (\d+)( \(double-sided\))?: (.*)', line)
+        if sheet_match is not None:
+            planned.append([(file, sheet_match.group(2) is not None) for file in sheet_match.group(3).split(', ') if file != '-'])
+
+    # The render prints every card it places, sheet by sheet and slot by slot
+    render_output = run_create_pdf(tmp_path, '--skip', '0', '--skip', '4')
+    rendered = [(file, double_sided != '') for double_sided, file in re.findall(r'^Image \d+( \(double-sided\))?: (.*)$', render_output, re.MULTILINE)]
+
+    assert [card for sheet in planned for card in sheet] == rendered
+    assert len(os.listdir(tmp_path / 'pages')) == 2 * len(planned)
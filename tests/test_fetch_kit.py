@@ -0,0 +1,50 @@
+import importlib
+
+from plugins.fetch_kit import load_fetch_module
+
+class CollectionResponse:
+    def __init__(self, identifiers):
+        self.identifiers = identifiers
+
+    def json(self):
+        return {'data': [{'set': identifier['set'], 'collector_number': identifier['collector_number']} for identifier in self.identifiers]}
+
+def test_kit_resolves_shared_cards_once(tmp_path, monkeypatch):
+    fetch_module = load_fetch_module('mtg')
+    scryfall = importlib.import_module('plugins.mtg.scryfall')
+
+    requests = []
+    def request_post(query, json):
+        requests.append(json['identifiers'])
+        return CollectionResponse(json['identifiers'])
+
+    monkeypatch.setattr(scryfall, 'request_post', request_post)
+    monkeypatch.setattr(scryfall, 'collection_cards', {})
+
+    first_deck = tmp_path / 'first.txt'
+    first_deck.write_text('4 Island (ZNR) 381\n2 Opt (XLN) 65\n')
+    second_deck = tmp_path / 'second.txt'
+    second_deck.write_text('4 Island (ZNR) 381\n1 Ponder (M12) 73\n')
+
+    deck_params = [
+        {'deck_path': str(deck_path), 'format': 'mtga', 'ignore_set_and_collector_number': False, 'bulk_data': False, 'bulk_data_file': None}
+        for deck_path in (first_deck, second_deck)
+    ]
+    fetch_module.prepare_kit(deck_params)
+
+    # Every deck's cards are sent together, and the shared card only once
+    assert len(requests) == 1
+    assert sorted((identifier['set'], identifier['collector_number']) for identifier in requests[0]) == [('m12', '73'), ('xln', '65'), ('znr', '381')]
+
+    # The decks then find their cards already resolved
+    assert scryfall.fetch_card_collection([('ZNR', '381'), ('M12', '73')]).keys() == {('znr', '381'), ('m12', '73')}
+    assert len(requests) == 1
+
+def test_games_load_their_own_plugin_modules():
+    mtg_fetch = load_fetch_module('mtg')
+    lorcana_fetch = load_fetch_module('lorcana')
+
+    # Both plugins have a deck_formats module, and each gets its own
+    assert mtg_fetch.parse_deck.__module__ == 'plugins.mtg.deck_formats'
+    assert lorcana_fetch.parse_deck.__module__ == 'plugins.lorcana.deck_formats'
+    assert {format.value for format in lorcana_fetch.DeckFormat} != {format.value for format in mtg_fetch.DeckFormat}
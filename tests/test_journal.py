@@ -0,0 +1,23 @@
+from plugins.common import journal
+from plugins.common.journal import JournalEntry, append_entry, configure_journal
+
+def test_other_runs_keep_the_journal_of_a_deck(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, 'journal_path', None)
+
+    first_run = {'deck_path': str(tmp_path / 'first.txt'), 'front_dir': str(tmp_path / 'front')}
+    second_run = {'deck_path': str(tmp_path / 'second.txt'), 'front_dir': str(tmp_path / 'front')}
+
+    configure_journal(first_run, directory=str(tmp_path))
+    append_entry(JournalEntry(card='first card'))
+
+    # A fetch of another deck starts its own journal
+    configure_journal(second_run, directory=str(tmp_path))
+    append_entry(JournalEntry(card='second card'))
+
+    configure_journal(first_run, resume=True, directory=str(tmp_path))
+    assert set(journal.completed_entries) == {'first card'}
+
+    configure_journal(second_run, resume=True, directory=str(tmp_path))
+    assert set(journal.completed_entries) == {'second card'}
+
+    journal.completed_entries.clear()
@@ -0,0 +1,61 @@
+import os
+
+import pytest
+
+from plugins.common import library
+from plugins.common.library import CopyMode, configure_library, save_card_art
+from plugins.common.manifest import configure_manifest
+
+@pytest.fixture(autouse=True)
+def reset_library():
+    yield
+
+    configure_library()
+    configure_manifest(None, '.')
+
+def make_card_art(tmp_path):
+    (tmp_path / 'front').mkdir()
+
+    card_art_path = tmp_path / 'library' / 'objects' / 'card'
+    card_art_path.parent.mkdir(parents=True)
+    card_art_path.write_bytes(b'art')
+
+    return str(card_art_path)
+
+def test_copies_are_independent_of_the_library(tmp_path):
+    configure_library(directory=str(tmp_path / 'library'))
+    card_art_path = make_card_art(tmp_path)
+
+    image_paths = [str(tmp_path / 'front' / f'card{counter}.png') for counter in range(3)]
+    assert save_card_art(card_art_path, image_paths) == image_paths
+
+    # Editing one image in place leaves the library and the other copies alone
+    with open(image_paths[0], 'r+b') as image:
+        image.write(b'ink')
+
+    with open(card_art_path, 'rb') as card_art:
+        assert card_art.read() == b'art'
+    with open(image_paths[1], 'rb') as image:
+        assert image.read() == b'art'
+
+def test_link_mode_shares_the_library_art(tmp_path, monkeypatch):
+    def no_reflink(source_path, destination_path):
+        raise OSError('Reflinks are not supported on this file system')
+
+    monkeypatch.setattr(library, 'reflink', no_reflink)
+    configure_library(directory=str(tmp_path / 'library'), copy_mode=CopyMode.LINK)
+    card_art_path = make_card_art(tmp_path)
+
+    image_paths = [str(tmp_path / 'front' / f'card{counter}.png') for counter in range(2)]
+    save_card_art(card_art_path, image_paths)
+
+    assert os.stat(image_paths[1]).st_nlink == 3
+
+def test_manifest_writes_the_first_copy(tmp_path):
+    configure_library(directory=str(tmp_path / 'library'))
+    card_art_path = make_card_art(tmp_path)
+    configure_manifest(str(tmp_path / 'deck.json'), str(tmp_path / 'front'))
+
+    image_paths = [str(tmp_path / 'front' / f'card{counter}.png') for counter in range(3)]
+    assert save_card_art(card_art_path, image_paths) == image_paths[:1]
+    assert os.listdir(tmp_path / 'front') == ['card0.png']
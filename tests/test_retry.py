@@ -0,0 +1,74 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+import pytest
+
+from plugins.common import http, retry
+from plugins.common.engine import AsyncEngine
+from plugins.common.retry import CircuitBreaker
+
+@pytest.fixture
+def flaky_server():
+    state = {'failures_left': 6, 'requests': 0}
+    lock = Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            with lock:
+                state['requests'] += 1
+                failing = state['failures_left'] > 0
+                state['failures_left'] -= 1
+
+            body = b'busy' if failing else b'ok'
+            self.send_response(503 if failing else 200)
+            self.send_header('content-length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f'http://127.0.0.1:{server.server_port}', state
+
+    server.shutdown()
+    server.server_close()
+
+def test_concurrent_requests_recover_after_host_fails_briefly(flaky_server, monkeypatch):
+    url, state = flaky_server
+
+    monkeypatch.setattr(retry, 'get_backoff', lambda attempt: 0.05)
+    monkeypatch.setitem(retry.host_breakers, url.split('//')[1], CircuitBreaker(cooldown=0.5))
+    http.configure_http(retries=4)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        responses = list(pool.map(lambda i: http.request_get(f'{url}/card/{i}'), range(8)))
+
+    # Every request finishes in one pass, even though the failures opened the circuit
+    assert [r.text for r in responses] == ['ok'] * 8
+    assert state['requests'] == 14
+
+def test_async_downloads_recover_after_host_fails_briefly(flaky_server, monkeypatch, tmp_path):
+    pytest.importorskip('aiohttp')
+    url, state = flaky_server
+
+    monkeypatch.setattr(retry, 'get_backoff', lambda attempt: 0.05)
+    monkeypatch.setitem(retry.host_breakers, url.split('//')[1], CircuitBreaker(cooldown=0.5))
+
+    engine = AsyncEngine(retries=4)
+    try:
+        async def download_all():
+            return await asyncio.gather(*[engine.stream_to_file(f'{url}/card/{i}', str(tmp_path / f'card{i}')) for i in range(8)])
+
+        engine.run(download_all())
+    finally:
+        engine.close()
+
+    # The async engine follows the same retries as send_request
+    assert [(tmp_path / f'card{i}').read_bytes() for i in range(8)] == [b'ok'] * 8
+    assert state['requests'] == 14
@@ -1,13 +1,17 @@
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
+from collections import Counter, deque
 import itertools
 import json
 import math
 import os
 from pathlib import Path
 import re
+import time
 from typing import Dict, List
 from xml.dom import ValidationErr
 from page_manager import generate_layout, generate_reg_mark
+from deck_manifest import DeckManifest, load_deck_manifest
 
 
 from natsort import natsorted
@@ -45,6 +49,19 @@ class CardOrientation(str, Enum):
     VERTICAL = "vertical"
     HORIZONTAL = "horizontal"
     
+class ImageFormat(str, Enum):
+    PNG = "png"
+    JPEG = "jpeg"
+    WEBP = "webp"
+    TIFF = "tiff"
+
+image_format_extensions = {
+    ImageFormat.PNG: "png",
+    ImageFormat.JPEG: "jpg",
+    ImageFormat.WEBP: "webp",
+    ImageFormat.TIFF: "tif"
+}
+
 orientation_dict={
     "vertical":False,
     "horizontal":True
@@ -68,6 +85,32 @@ class Layouts(BaseModel):
     card_sizes: Dict[CardSize, CardLayoutSize]
     paper_layouts: Dict[PaperSize, PaperLayout]
 
+class SheetLayout(BaseModel):
+    number: int
+    double_sided: bool
+    cards: List[str | None]
+    # Back image of each card on a double-sided sheet, relative to the double-sided directory
+    backs: List[str | None] = []
+
+class ImageHeader(BaseModel):
+    format: str | None
+    mode: str
+    # Dimensions after applying the EXIF orientation
+    width: int
+    height: int
+    orientation: int
+
+class OutputTarget(BaseModel):
+    path: str
+    ppi: int
+    image_format: ImageFormat | None = None
+
+# Formats that can be decoded for card images
+SUPPORTED_IMAGE_FORMATS = {'PNG', 'JPEG', 'MPO', 'WEBP', 'TIFF', 'BMP', 'GIF', 'AVIF'}
+
+# Maximum relative difference between the aspect ratio of a card image and the card size
+ASPECT_RATIO_TOLERANCE = 0.05
+
 # Known junk files across OSes
 EXTRANEOUS_FILES = {
     ".DS_Store",
@@ -111,6 +154,69 @@ def parse_crop_string(crop_string: str | None, card_width: int, card_height: int
 
     raise ValueError(f"Invalid crop format: '{crop_string}'")
 
+def parse_output_string(output_string: str, default_ppi: int) -> OutputTarget:
+    """
+    Parses an output target in the format "path[@ppi][:format]".
+
+    "game.pdf@600" -> PDF at 600 ppi
+    "proof.pdf" -> PDF at the default ppi
+    "previews/@72:jpeg" -> JPEG page images at 72 ppi
+    """
+    output_match = re.fullmatch(r"(.+?)(?:@([^@:/\\]*))?(?::(\w+))?", output_string.strip())
+    if output_match is None:
+        raise ValueError(f'Invalid output format: "{output_string}"')
+
+    path, ppi_string, format_string = output_match.groups()
+    if ppi_string is None:
+        ppi = default_ppi
+    elif ppi_string.isdigit() and int(ppi_string) > 0:
+        ppi = int(ppi_string)
+    else:
+        raise ValueError(f'Invalid ppi "{ppi_string}" in output "{output_string}". The ppi must be a positive whole number.')
+
+    if path.lower().endswith(".pdf"):
+        if format_string is not None:
+            raise ValueError(f'Cannot use image format "{format_string}" for PDF output "{output_string}".')
+
+        return OutputTarget(path=path, ppi=ppi)
+
+    try:
+        image_format = ImageFormat(format_string.lower()) if format_string is not None else ImageFormat.PNG
+    except ValueError:
+        raise ValueError(f'Unsupported image format "{format_string}" in output "{output_string}". Try image formats: {[t.value for t in ImageFormat]}.')
+
+    return OutputTarget(path=path, ppi=ppi, image_format=image_format)
+
+def parse_sheet_string(sheet_string: str | None) -> set[int]:
+    """
+    Parses a selection of sheet numbers.
+
+    "3" -> {3}
+    "3,7-9" -> {3, 7, 8, 9}
+    """
+    if sheet_string is None:
+        return set()
+
+    sheet_numbers = set()
+    for part in sheet_string.split(','):
+        part = part.strip()
+
+        range_match = re.fullmatch(r"(\d+)\s*-\s*(\d+)", part)
+        if range_match:
+            start, end = int(range_match.group(1)), int(range_match.group(2))
+            if start > end:
+                raise ValueError(f'Invalid sheet range: "{part}"')
+
+            sheet_numbers.update(range(start, end + 1))
+
+        elif part.isdigit():
+            sheet_numbers.add(int(part))
+
+        else:
+            raise ValueError(f'Invalid sheet format: "{sheet_string}"')
+
+    return sheet_numbers
+
 def convertInToCrop(crop_in: float, card_width_px: int, card_height_px: int) -> tuple[float, float]:
     # Convert from pixels to physical mm using DPI
     # Card dimensions are based on 300 ppi
@@ -181,6 +287,122 @@ def get_back_card_image_path(back_dir_path) -> str | None:
 
     return os.path.join(back_dir_path, files[index])
 
+def read_image_header(path: str) -> ImageHeader:
+    # Opening an image only parses its header, the pixel data is decoded lazily
+    with Image.open(path) as im:
+        exif = Image.Exif()
+        if 'exif' in im.info:
+            exif.load(im.info['exif'])
+        elif im.format != 'PNG':
+            # PNG can store EXIF data after the pixel data, which would force a full decode
+            exif = im.getexif()
+
+        orientation = exif.get(0x0112, 1)
+        width, height = im.size
+
+        # Orientations 5 to 8 are rotated by 90 degrees
+        if orientation in (5, 6, 7, 8):
+            width, height = height, width
+
+        return ImageHeader(format=im.format, mode=im.mode, width=width, height=height, orientation=orientation)
+
+def read_image_headers(paths: List[str]) -> tuple[Dict[str, ImageHeader], Dict[str, str]]:
+    headers = {}
+    errors = {}
+
+    def read_header(path: str) -> None:
+        try:
+            headers[path] = read_image_header(path)
+        except Exception as e:
+            errors[path] = str(e)
+
+    with ThreadPoolExecutor() as executor:
+        list(executor.map(read_header, paths))
+
+    return headers, errors
+
+def get_sheet_image_paths(selected_sheets: List[SheetLayout], front_dir_path: str, double_sided_dir_path: str, back_card_image_path: str | None) -> List[str]:
+    image_paths = []
+    for sheet in selected_sheets:
+        for file, back_file in zip(sheet.cards, sheet.backs):
+            if file is not None:
+                image_paths.append(os.path.join(front_dir_path, file))
+                if sheet.double_sided:
+                    image_paths.append(os.path.join(double_sided_dir_path, back_file))
+
+    if back_card_image_path is not None and any(not sheet.double_sided for sheet in selected_sheets):
+        image_paths.append(back_card_image_path)
+
+    return image_paths
+
+def get_source_crop(crop: tuple[float, float], card_orientation: bool) -> tuple[float, float]:
+    # Crop percentages follow the card layout, but horizontal cards are rotated into place before they are cropped
+    crop_x_percent, crop_y_percent = crop
+    if card_orientation:
+        return (crop_y_percent, crop_x_percent)
+
+    return (crop_x_percent, crop_y_percent)
+
+def check_image_headers(
+    image_paths: List[str],
+    headers: Dict[str, ImageHeader],
+    errors: Dict[str, str],
+    back_card_image_path: str | None,
+    card_layout_size: CardLayoutSize,
+    crop: tuple[float, float],
+    card_orientation: bool
+) -> List[str]:
+    # Card images are rotated into place for horizontal layouts
+    expected_aspect_ratio = card_layout_size.width / card_layout_size.height
+    if card_orientation:
+        expected_aspect_ratio = 1 / expected_aspect_ratio
+
+    crop_x_percent, crop_y_percent = get_source_crop(crop, card_orientation)
+
+    problems = []
+    for path in image_paths:
+        if path in errors:
+            problems.append(f'{path} cannot be read: {errors[path]}')
+            continue
+
+        header = headers[path]
+
+        if header.format not in SUPPORTED_IMAGE_FORMATS:
+            problems.append(f'{path} has unsupported format "{header.format}"')
+
+        if header.orientation not in range(1, 9):
+            problems.append(f'{path} has invalid EXIF orientation {header.orientation}')
+
+        if header.width <= 0 or header.height <= 0:
+            problems.append(f'{path} has invalid dimensions {header.width}x{header.height}')
+            continue
+
+        # The card back is not cropped
+        width, height = header.width, header.height
+        if path != back_card_image_path:
+            width = width * (1 - crop_x_percent / 100)
+            height = height * (1 - crop_y_percent / 100)
+
+        aspect_ratio = width / height
+        if abs(aspect_ratio - expected_aspect_ratio) / expected_aspect_ratio > ASPECT_RATIO_TOLERANCE:
+            problems.append(f'{path} has aspect ratio {aspect_ratio:.3f} ({header.width}x{header.height}), expected {expected_aspect_ratio:.3f}')
+
+    return problems
+
+def preflight_images(
+    image_paths: List[str],
+    back_card_image_path: str | None,
+    card_layout_size: CardLayoutSize,
+    crop: tuple[float, float],
+    card_orientation: bool
+) -> None:
+    headers, errors = read_image_headers(image_paths)
+    problems = check_image_headers(image_paths, headers, errors, back_card_image_path, card_layout_size, crop, card_orientation)
+
+    if len(problems) > 0:
+        problem_lines = '\n'.join(f'  {problem}' for problem in problems)
+        raise Exception(f'Found {len(problems)} problem{"s" if len(problems) != 1 else ""} with the card images:\n{problem_lines}')
+
 def draw_card_with_bleed(card_image: Image, base_image: Image, box: tuple[int, int, int, int], print_bleed: tuple[int, int]):
     origin_x, origin_y, _, _ = box
 
@@ -284,16 +506,12 @@ def draw_card_layout(
             tuple(math.ceil(bleed * ppi_ratio) + extend_corners_ppi for bleed in print_bleed)
         )
 
-def add_front_back_pages(front_page: Image.Image, back_page: Image.Image, pages: List[Image.Image], page_width: int, page_height: int, ppi_ratio: float, template: str, only_fronts: bool, name: str):
+def add_front_back_pages(front_page: Image.Image, back_page: Image.Image, pages: List[Image.Image], page_width: int, page_height: int, ppi_ratio: float, template: str, only_fronts: bool, name: str, num_sheet: int):
     # Add template version number to the back
     draw = ImageDraw.Draw(front_page)
     font = ImageFont.truetype(os.path.join(asset_directory, 'arial.ttf'), 40 * ppi_ratio)
 
     # "Raw" specified location
-    num_sheet = len(pages) + 1
-    if not only_fronts:
-        num_sheet = int(len(pages) / 2) + 1
-
     label = f'sheet: {num_sheet}, template: {template}'
     if name is not None:
         label = f'name: {name}, {label}'
@@ -305,12 +523,132 @@ def add_front_back_pages(front_page: Image.Image, back_page: Image.Image, pages:
     if not only_fronts:
         pages.append(back_page)
 
+def assign_card_slots(card_groups: List[tuple[bool, List[tuple[str, str | None]]]], num_cards: int, skip_indices: List[int]) -> List[SheetLayout]:
+    sheets: List[SheetLayout] = []
+
+    for double_sided, card_files in card_groups:
+        it = iter(card_files)
+        while True:
+            file_group = list(itertools.islice(it, num_cards - len(skip_indices)))
+            if not file_group:
+                break
+
+            cards = []
+            backs = []
+            file_group_iterator = iter(file_group)
+            for i in range(num_cards):
+                if i in skip_indices:
+                    cards.append(None)
+                    backs.append(None)
+                    continue
+
+                try:
+                    file, back_file = next(file_group_iterator)
+                except StopIteration:
+                    break
+
+                cards.append(file)
+                backs.append(back_file)
+
+            sheets.append(SheetLayout(number=len(sheets) + 1, double_sided=double_sided, cards=cards, backs=backs))
+
+    return sheets
+
+def assign_sheets(front_image_filenames: List[str], ds_image_filenames: List[str], num_cards: int, skip_indices: List[int]) -> List[SheetLayout]:
+    front_set = set(front_image_filenames)
+    ds_set = set(ds_image_filenames)
+
+    # Single-sided cards come first, followed by the double-sided cards
+    # Double-sided backs have the same filename as their fronts
+    return assign_card_slots([
+        (False, [(file, None) for file in natsorted(list(front_set - ds_set))]),
+        (True, [(file, file) for file in natsorted(list(ds_set))])
+    ], num_cards, skip_indices)
+
+def assign_manifest_sheets(manifest: DeckManifest, num_cards: int, skip_indices: List[int]) -> List[SheetLayout]:
+    # Every copy of a card takes its own slot, in manifest order
+    single_sided_cards = [(card.front, None) for card in manifest.cards if card.back is None for _ in range(card.quantity)]
+    double_sided_cards = [(card.front, card.back) for card in manifest.cards if card.back is not None for _ in range(card.quantity)]
+
+    return assign_card_slots([(False, single_sided_cards), (True, double_sided_cards)], num_cards, skip_indices)
+
+def get_image_identity(path: str) -> tuple:
+    # Hardlinked copies of a card share an inode, so they are decoded only once
+    try:
+        stat = os.stat(path)
+        if stat.st_ino != 0:
+            return (stat.st_dev, stat.st_ino)
+    except OSError:
+        pass
+
+    return (os.path.normcase(os.path.abspath(path)),)
+
+class CardImageCache:
+    """
+    Decodes every unique card image once, however many slots it fills.
+
+    Images are released after their last use so that memory stays bounded by
+    the images shared between sheets.
+    """
+
+    def __init__(self, image_paths: List[str]):
+        self.uses = Counter(get_image_identity(path) for path in image_paths)
+        self.images: Dict[tuple, Image.Image] = {}
+
+    def open(self, path: str) -> Image.Image:
+        identity = get_image_identity(path)
+
+        image = self.images.get(identity)
+        if image is None:
+            image = ImageOps.exif_transpose(Image.open(path))
+
+        self.uses[identity] = self.uses[identity] - 1
+        if self.uses[identity] > 0:
+            self.images[identity] = image
+        else:
+            self.images.pop(identity, None)
+
+        return image
+
+def select_sheets(sheets: List[SheetLayout], sheet_numbers: set[int], card_filenames: List[str]) -> List[SheetLayout]:
+    if len(sheet_numbers) == 0 and len(card_filenames) == 0:
+        return sheets
+
+    invalid_sheet_numbers = sorted(n for n in sheet_numbers if n < 1 or n > len(sheets))
+    if len(invalid_sheet_numbers) > 0:
+        raise Exception(f'Sheets {invalid_sheet_numbers} are outside range 1-{len(sheets)}.')
+
+    # Cards can be selected by their path relative to the front directory or by their filename
+    selected_card_filenames = {os.path.normpath(f) for f in card_filenames}
+    found_card_filenames = set()
+
+    selected_sheets = []
+    for sheet in sheets:
+        card_matches = {
+            f for f in selected_card_filenames
+            for card in sheet.cards
+            if card is not None and (f == os.path.normpath(card) or f == os.path.basename(card))
+        }
+        found_card_filenames.update(card_matches)
+
+        if sheet.number in sheet_numbers or len(card_matches) > 0:
+            selected_sheets.append(sheet)
+
+    missing_card_filenames = selected_card_filenames - found_card_filenames
+    if len(missing_card_filenames) > 0:
+        raise Exception(f'Cards {sorted(missing_card_filenames)} were not found in any sheet.')
+
+    print(f'Rendering sheets: {[sheet.number for sheet in selected_sheets]}')
+
+    return selected_sheets
+
 def generate_pdf(
     front_dir_path: str,
     back_dir_path: str,
     double_sided_dir_path: str,
     output_path: str,
     output_images: bool,
+    image_format: ImageFormat,
     card_size: CardSize,
     card_width: str,
     card_height: str,
@@ -330,7 +668,12 @@ def generate_pdf(
     skip_indices: List[int],
     load_offset: bool,
     name: str,
-    dxf: bool
+    dxf: bool,
+    outputs: List[str] = (),
+    sheet_string: str | None = None,
+    card_filenames: List[str] = (),
+    plan: bool = False,
+    manifest_path: str | None = None
 ):
     # Sanity checks for the different directories
     f_path = Path(front_dir_path)
@@ -350,12 +693,23 @@ def generate_pdf(
     delete_hidden_files_in_directory(back_dir_path)
     delete_hidden_files_in_directory(double_sided_dir_path)
 
-    # Sanity check for output images
-    if output_images:
-        output_path = get_directory(output_path)
+    # Sanity check for the outputs
+    if len(outputs) > 0:
+        output_targets = [parse_output_string(output_string, ppi) for output_string in outputs]
     else:
-        if not output_path.lower().endswith(".pdf"):
-            raise Exception(f'Cannot save PDF to output path "{output_path}" because it is not a valid PDF file path.')
+        output_targets = [OutputTarget(path=output_path, ppi=ppi, image_format=image_format if output_images else None)]
+
+    for output_target in output_targets:
+        if output_target.image_format is not None:
+            # Image targets from --output always name a directory, --output_path names the PDF beside them
+            output_target.path = os.path.abspath(output_target.path) if len(outputs) > 0 else get_directory(output_target.path)
+            os.makedirs(output_target.path, exist_ok=True)
+        else:
+            if not output_target.path.lower().endswith(".pdf"):
+                raise Exception(f'Cannot save PDF to output path "{output_target.path}" because it is not a valid PDF file path.')
+
+    # Compose the sheets once at the highest requested resolution, other outputs are downsampled
+    ppi = max(output_target.ppi for output_target in output_targets)
 
     # Get the back image, if it exists
     back_card_image_path = None
@@ -366,21 +720,34 @@ def generate_pdf(
         if use_default_back_page:
             print(f'No back image provided in back image directory \"{back_dir_path}\". Using default instead.')
 
-    front_image_filenames = get_image_file_paths(front_dir_path)
-    ds_image_filenames = get_image_file_paths(double_sided_dir_path)
+    manifest = None
+    if manifest_path is not None:
+        # The manifest lists every image, so the image directories are not walked
+        manifest = load_deck_manifest(manifest_path)
 
-    # Check if double-sided back images has matching front images
-    front_set = set(front_image_filenames)
-    ds_set = set(ds_image_filenames)
-    if not ds_set.issubset(front_set):
-        raise Exception(f'Double-sided backs "{ds_set - front_set}" do not have matching fronts. Add the missing fronts to front image directory "{front_dir_path}".')
+        # Manifest image paths are relative to the manifest
+        front_dir_path = os.path.dirname(manifest_path)
+        double_sided_dir_path = front_dir_path
+
+        if only_fronts and any(card.back is not None for card in manifest.cards):
+            raise Exception(f'Cannot use "--only_fronts" with double-sided cards. Remove the backs from deck manifest "{manifest_path}".')
+
+    else:
+        front_image_filenames = get_image_file_paths(front_dir_path)
+        ds_image_filenames = get_image_file_paths(double_sided_dir_path)
 
-    if only_fronts:
-        if len(ds_set) > 0:
-            raise Exception(f'Cannot use "--only_fronts" with double-sided cards. Remove cards from double-side image directory "{double_sided_dir_path}".')
+        # Check if double-sided back images has matching front images
+        front_set = set(front_image_filenames)
+        ds_set = set(ds_image_filenames)
+        if not ds_set.issubset(front_set):
+            raise Exception(f'Double-sided backs "{ds_set - front_set}" do not have matching fronts. Add the missing fronts to front image directory "{front_dir_path}".')
+
+        if only_fronts:
+            if len(ds_set) > 0:
+                raise Exception(f'Cannot use "--only_fronts" with double-sided cards. Remove cards from double-side image directory "{double_sided_dir_path}".')
 
     try:
-        layouts_data = generate_layout(card_size, paper_size, orientation_dict[card_orientation], card_width, card_height, card_radius, paper_width, paper_height, reg_mark_inset, reg_mark_thickness, reg_mark_length, dxf)
+        layouts_data = generate_layout(card_size, paper_size, orientation_dict[card_orientation], card_width, card_height, card_radius, paper_width, paper_height, reg_mark_inset, reg_mark_thickness, reg_mark_length, dxf and not plan)
         layouts = Layouts(**layouts_data)
 
 
@@ -414,6 +781,54 @@ def generate_pdf(
     if len(clean_skip_indices) == num_cards:
         raise Exception(f'You cannot skip all cards per page')
 
+    # Compute the full slot assignment, then only compose the requested sheets
+    if manifest is not None:
+        sheets = assign_manifest_sheets(manifest, num_cards, clean_skip_indices)
+    else:
+        sheets = assign_sheets(front_image_filenames, ds_image_filenames, num_cards, clean_skip_indices)
+    selected_sheets = select_sheets(sheets, parse_sheet_string(sheet_string), card_filenames)
+
+    # Only estimate the cost of the run, without decoding or composing any images
+    if plan:
+        print_render_plan(
+            sheets,
+            selected_sheets,
+            front_dir_path,
+            double_sided_dir_path,
+            back_card_image_path,
+            paper_layout,
+            card_layout_size,
+            crop,
+            orientation_dict[card_orientation],
+            only_fronts,
+            load_offset,
+            output_targets,
+            ppi,
+            num_cards - len(clean_skip_indices)
+        )
+        return
+
+    # Check every image header before any expensive work
+    sheet_image_paths = get_sheet_image_paths(selected_sheets, front_dir_path, double_sided_dir_path, back_card_image_path)
+    preflight_images(
+        sheet_image_paths,
+        back_card_image_path,
+        card_layout_size,
+        crop,
+        orientation_dict[card_orientation]
+    )
+
+    # Number every image by its position in the full slot assignment
+    image_numbers = {}
+    num_image = 1
+    for sheet in sheets:
+        for slot, file in enumerate(sheet.cards):
+            if file is not None:
+                image_numbers[(sheet.number, slot)] = num_image
+                num_image = num_image + 1
+
+    card_images = CardImageCache([path for path in sheet_image_paths if path != back_card_image_path])
+
     # The baseline PPI is 300
     ppi_ratio = ppi / 300
 
@@ -424,11 +839,14 @@ def generate_pdf(
         # Create the array that will store the filled templates
         pages: List[Image.Image] = []
 
+        # Page images are numbered as in a run of every sheet, so reprints replace the pages they reprint
+        page_numbers: List[int] = []
+
         max_print_bleed = calculate_max_print_bleed(card_layout.x_pos, card_layout.y_pos, card_layout_size.width, card_layout_size.height)
 
         # Create reusable back page for single-sided cards
         single_sided_back_page = reg_im.copy()
-        if not use_default_back_page:
+        if not use_default_back_page and any(not sheet.double_sided for sheet in selected_sheets):
 
             # Load the card back image
             with Image.open(back_card_image_path) as back_im:
@@ -455,109 +873,34 @@ def generate_pdf(
                     card_orientation=orientation_dict[card_orientation]
                 )
 
-        # Create single-sided card layout
-        num_image = 1
-        it = iter(natsorted(list(front_set - ds_set)))
-        while True:
-            file_group = list(itertools.islice(it, num_cards - len(clean_skip_indices)))
-            if not file_group:
-                break
-
-            # Fetch card art
-            front_card_images = []
-            file_group_iterator = iter(file_group)
-            for i in range(num_cards):
-                if i in clean_skip_indices:
-                    front_card_images.append(None)
-                    continue
-
-                try:
-                    file = next(file_group_iterator)
-                except StopIteration:
-                    break
-
-                print(f'Image {num_image}: {file}')
-                num_image = num_image + 1
-
-                front_image_path = os.path.join(front_dir_path, file)
-                front_image = Image.open(front_image_path)
-                front_image = ImageOps.exif_transpose(front_image)
-                front_card_images.append(front_image)
-
-            single_sided_front_page = reg_im.copy()
-
-            # Create front layout for single-sided cards
-            draw_card_layout(
-                front_card_images,
-                single_sided_front_page,
-                num_rows,
-                num_cols,
-                card_layout.x_pos,
-                card_layout.y_pos,
-                card_layout_size.width,
-                card_layout_size.height,
-                max_print_bleed,
-                crop,
-                ppi_ratio,
-                extend_corners,
-                flip=False,
-                card_orientation=orientation_dict[card_orientation]
-            )
-
-            add_front_back_pages(
-                single_sided_front_page,
-                single_sided_back_page,
-                pages,
-                paper_layout.width,
-                paper_layout.height,
-                ppi_ratio,
-                card_layout.template,
-                only_fronts,
-                name
-            )
-
-        # Create double-sided card layout
-        it = iter(natsorted(list(ds_set)))
-        while True:
-            file_group = list(itertools.islice(it, num_cards - len(clean_skip_indices)))
-            if not file_group:
-                break
-
+        for sheet in selected_sheets:
             # Fetch card art
             front_card_images = []
             back_card_images = []
-            file_group_iterator = iter(file_group)
-            for i in range(num_cards):
-                if i in clean_skip_indices:
+            for slot, (file, back_file) in enumerate(zip(sheet.cards, sheet.backs)):
+                if file is None:
                     front_card_images.append(None)
                     back_card_images.append(None)
                     continue
 
-                try:
-                    file = next(file_group_iterator)
-                except StopIteration:
-                    break
-
-                print(f'Image {num_image} (double-sided): {file}')
-                num_image = num_image + 1
+                if sheet.double_sided:
+                    print(f'Image {image_numbers[(sheet.number, slot)]} (double-sided): {file}')
+                else:
+                    print(f'Image {image_numbers[(sheet.number, slot)]}: {file}')
 
                 front_image_path = os.path.join(front_dir_path, file)
-                front_image = Image.open(front_image_path)
-                front_image = ImageOps.exif_transpose(front_image)
-                front_card_images.append(front_image)
+                front_card_images.append(card_images.open(front_image_path))
 
-                ds_image_path = os.path.join(double_sided_dir_path, file)
-                ds_image = Image.open(ds_image_path)
-                ds_image = ImageOps.exif_transpose(ds_image)
-                back_card_images.append(ds_image)
+                if sheet.double_sided:
+                    ds_image_path = os.path.join(double_sided_dir_path, back_file)
+                    back_card_images.append(card_images.open(ds_image_path))
 
-            double_sided_front_page = reg_im.copy()
-            double_sided_back_page = reg_im.copy()
+            front_page = reg_im.copy()
 
-            # Create front layout for double-sided cards
+            # Create front layout
             draw_card_layout(
                 front_card_images,
-                double_sided_front_page,
+                front_page,
                 num_rows,
                 num_cols,
                 card_layout.x_pos,
@@ -572,37 +915,47 @@ def generate_pdf(
                 card_orientation=orientation_dict[card_orientation]
             )
 
-            # Create back layout for double-sided cards
-            draw_card_layout(
-                back_card_images,
-                double_sided_back_page,
-                num_rows,
-                num_cols,
-                card_layout.x_pos,
-                card_layout.y_pos,
-                card_layout_size.width,
-                card_layout_size.height,
-                max_print_bleed,
-                crop,
-                ppi_ratio,
-                extend_corners,
-                flip=True,
-                card_orientation=orientation_dict[card_orientation]
-            )
+            back_page = single_sided_back_page
+            if sheet.double_sided:
+                back_page = reg_im.copy()
+
+                # Create back layout for double-sided cards
+                draw_card_layout(
+                    back_card_images,
+                    back_page,
+                    num_rows,
+                    num_cols,
+                    card_layout.x_pos,
+                    card_layout.y_pos,
+                    card_layout_size.width,
+                    card_layout_size.height,
+                    max_print_bleed,
+                    crop,
+                    ppi_ratio,
+                    extend_corners,
+                    flip=True,
+                    card_orientation=orientation_dict[card_orientation]
+                )
 
             # Add the front and back layouts
             add_front_back_pages(
-                double_sided_front_page,
-                double_sided_back_page,
+                front_page,
+                back_page,
                 pages,
                 paper_layout.width,
                 paper_layout.height,
                 ppi_ratio,
                 card_layout.template,
-                False,
-                name
+                only_fronts and not sheet.double_sided,
+                name,
+                sheet.number
             )
 
+            if only_fronts:
+                page_numbers.append(sheet.number)
+            else:
+                page_numbers.extend([2 * sheet.number - 1, 2 * sheet.number])
+
         if len(pages) == 0:
             print('No pages were generated')
             return
@@ -617,16 +970,263 @@ def generate_pdf(
                 print(f'Loaded x offset: {saved_offset.x_offset}, y offset: {saved_offset.y_offset}')
                 pages = offset_images(pages, saved_offset.x_offset, saved_offset.y_offset, ppi)
 
-        # Save the pages array as a PDF
-        if output_images:
-            for index, page in enumerate(pages):
-                page.save(os.path.join(output_path, f'page{index + 1}.png'), resolution=math.floor(300 * ppi_ratio), speed=0, subsampling=0, quality=quality)
+        # Save the pages array as PDFs and images
+        save_outputs(pages, page_numbers, output_targets, ppi, quality)
+
+def get_image_save_options(image_format: ImageFormat, quality: int, resolution: int) -> dict:
+    # Each encoder only understands its own parameters, so only pass the ones that apply
+    if image_format == ImageFormat.PNG:
+        # PNG is lossless, so trade a little file size for much faster zlib compression
+        return {'format': 'PNG', 'dpi': (resolution, resolution), 'compress_level': 1}
+
+    if image_format == ImageFormat.JPEG:
+        return {'format': 'JPEG', 'dpi': (resolution, resolution), 'quality': quality, 'subsampling': 0}
+
+    if image_format == ImageFormat.WEBP:
+        return {'format': 'WEBP', 'dpi': (resolution, resolution), 'quality': quality, 'lossless': quality == 100, 'method': 0}
+
+    if image_format == ImageFormat.TIFF:
+        return {'format': 'TIFF', 'dpi': (resolution, resolution), 'compression': 'tiff_adobe_deflate'}
+
+    raise ValueError(f'Unsupported image format "{image_format}".')
+
+def save_outputs(pages: List[Image.Image], page_numbers: List[int], output_targets: List[OutputTarget], ppi: int, quality: int) -> None:
+    image_targets = [output_target for output_target in output_targets if output_target.image_format is not None]
+    pdf_targets = [output_target for output_target in output_targets if output_target.image_format is None]
+
+    for output_target in image_targets:
+        os.makedirs(output_target.path, exist_ok=True)
+
+    def downsample_page(page: Image.Image, output_target: OutputTarget) -> Image.Image:
+        if output_target.ppi == ppi:
+            return page
+
+        scale = output_target.ppi / ppi
+        target_size = (max(1, math.floor(page.width * scale)), max(1, math.floor(page.height * scale)))
+        return page.resize(target_size, Image.Resampling.LANCZOS)
+
+    def save_page(index: int, page: Image.Image) -> List[Image.Image]:
+        # Image targets are saved straight away, PDF pages are returned to be written in order
+        for output_target in image_targets:
+            image_format = ImageFormat(output_target.image_format)
+            save_options = get_image_save_options(image_format, quality, output_target.ppi)
+            downsample_page(page, output_target).save(os.path.join(output_target.path, f'page{page_numbers[index]}.{image_format_extensions[image_format]}'), **save_options)
+
+        return [downsample_page(page, output_target) for output_target in pdf_targets]
 
-            print(f'Generated images: {output_path}')
+    def write_pdf_pages(index: int, target_pages: List[Image.Image]) -> None:
+        # Each page is appended to the PDF, so only the pages being worked on are held for each target
+        for output_target, target_page in zip(pdf_targets, target_pages):
+            target_page.save(output_target.path, format='PDF', append=index > 0, resolution=output_target.ppi, speed=0, subsampling=0, quality=quality)
 
+    # Every page is downsampled and saved for all of the outputs in a single pass, a few pages at a time.
+    # Pillow releases the GIL while resizing and encoding, so the pages are worked on in parallel
+    max_workers = os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = deque()
+        for index, page in enumerate(pages):
+            in_flight.append((index, executor.submit(save_page, index, page)))
+
+            if len(in_flight) >= max_workers:
+                finished_index, future = in_flight.popleft()
+                write_pdf_pages(finished_index, future.result())
+
+        while len(in_flight) > 0:
+            finished_index, future = in_flight.popleft()
+            write_pdf_pages(finished_index, future.result())
+
+    for output_target in output_targets:
+        if output_target.image_format is not None:
+            print(f'Generated images: {output_target.path}')
+        else:
+            print(f'Generated PDF: {output_target.path}')
+
+# Reference per-stage render costs, in seconds on a single core, from a few runs of `create_pdf.py` on the example cards.
+# --plan times decoding and resizing one card on the running machine, and scales the other stages by how the resize compares
+DECODE_SECONDS_PER_MEGAPIXEL = 0.018
+RESIZE_SECONDS_PER_MEGAPIXEL = 0.045
+BLEED_SECONDS_PER_CARD = 0.008
+PAGE_SECONDS_PER_MEGAPIXEL = 0.003
+DOWNSAMPLE_SECONDS_PER_MEGAPIXEL = 0.026
+PDF_SECONDS_PER_MEGAPIXEL = 0.010
+IMAGE_SECONDS_PER_MEGAPIXEL = {
+    ImageFormat.PNG: 0.025,
+    ImageFormat.JPEG: 0.007,
+    ImageFormat.WEBP: 0.025,
+    ImageFormat.TIFF: 0.016
+}
+
+def format_bytes(num_bytes: float) -> str:
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if num_bytes < 1024:
+            return f'{num_bytes:.1f} {unit}'
+        num_bytes = num_bytes / 1024
+
+    return f'{num_bytes:.1f} TB'
+
+def measure_card_costs(image_path: str, card_size: tuple[int, int]) -> tuple[float, float] | None:
+    """
+    Times decoding a card image and resizing it to the card size on this machine.
+
+    Returns the decode and resize costs in seconds per megapixel, or None if the image cannot be decoded.
+    """
+    try:
+        with Image.open(image_path) as image:
+            start = time.perf_counter()
+            image.load()
+            decode_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            image.resize(card_size)
+            resize_seconds = time.perf_counter() - start
+
+            return decode_seconds / (image.width * image.height / 1e6), resize_seconds / (card_size[0] * card_size[1] / 1e6)
+    except (OSError, ValueError):
+        return None
+
+def print_render_plan(
+    sheets: List[SheetLayout],
+    selected_sheets: List[SheetLayout],
+    front_dir_path: str,
+    double_sided_dir_path: str,
+    back_card_image_path: str | None,
+    paper_layout: PaperLayout,
+    card_layout_size: CardLayoutSize,
+    crop: tuple[float, float],
+    card_orientation: bool,
+    only_fronts: bool,
+    load_offset: bool,
+    output_targets: List[OutputTarget],
+    ppi: int,
+    num_back_cards: int
+) -> None:
+    ppi_ratio = ppi / 300
+
+    # Collect every image that would be decoded, reading only the image headers
+    image_paths = get_sheet_image_paths(selected_sheets, front_dir_path, double_sided_dir_path, back_card_image_path)
+    has_single_sided_back = back_card_image_path in image_paths
+
+    headers, errors = read_image_headers(image_paths)
+
+    print(f'Sheets: {len(selected_sheets)} of {len(sheets)}')
+    for sheet in selected_sheets:
+        cards = ', '.join(file if file is not None else '-' for file in sheet.cards)
+        print(f'Sheet {sheet.number}{" (double-sided)" if sheet.double_sided else ""}: {cards}')
+
+    # The card size in the layout is based on 300 ppi
+    card_width_in = card_layout_size.width / 300
+    card_height_in = card_layout_size.height / 300
+    if card_orientation:
+        card_width_in, card_height_in = card_height_in, card_width_in
+
+    # Compare the resolution of the source images against the target ppi
+    crop_x_percent, crop_y_percent = get_source_crop(crop, card_orientation)
+    low_resolution_paths = []
+    source_ppis = []
+    for path in image_paths:
+        header = headers.get(path)
+        if header is None:
+            continue
+
+        if path == back_card_image_path:
+            source_ppi = min(header.width / card_width_in, header.height / card_height_in)
         else:
-            pages[0].save(output_path, format='PDF', save_all=True, append_images=pages[1:], resolution=math.floor(300 * ppi_ratio), speed=0, subsampling=0, quality=quality)
-            print(f'Generated PDF: {output_path}')
+            source_ppi = min(
+                header.width * (1 - crop_x_percent / 100) / card_width_in,
+                header.height * (1 - crop_y_percent / 100) / card_height_in
+            )
+
+        source_ppis.append(source_ppi)
+        if source_ppi < ppi:
+            low_resolution_paths.append((path, math.floor(source_ppi)))
+
+    if len(source_ppis) > 0:
+        print(f'Source images: {len(headers)}, resolution: {math.floor(min(source_ppis))}-{math.floor(max(source_ppis))} ppi, target: {ppi} ppi')
+
+    if len(low_resolution_paths) > 0:
+        print(f'Images below {ppi} ppi: {len(low_resolution_paths)}')
+        for path, source_ppi in low_resolution_paths[:10]:
+            print(f'  {path} ({source_ppi} ppi)')
+
+        if len(low_resolution_paths) > 10:
+            print(f'  ...and {len(low_resolution_paths) - 10} more')
+
+    for problem in check_image_headers(image_paths, headers, errors, back_card_image_path, card_layout_size, crop, card_orientation):
+        print(f'Problem: {problem}')
+
+    # Project the peak memory, every page is kept in memory until it is saved
+    page_pixels = math.floor(paper_layout.width * ppi_ratio) * math.floor(paper_layout.height * ppi_ratio)
+    num_pages = len(selected_sheets) if only_fronts else 2 * len(selected_sheets)
+    num_page_images = 2 + len(selected_sheets) + sum(1 for sheet in selected_sheets if sheet.double_sided)
+    if load_offset:
+        num_page_images = num_page_images + num_pages // 2
+
+    page_bytes = num_page_images * page_pixels * 3
+
+    # Downsampled pages are saved a few at a time, see `save_outputs`
+    num_pages_in_flight = min(num_pages, os.cpu_count() or 1)
+    for output_target in output_targets:
+        if output_target.ppi != ppi:
+            page_bytes = page_bytes + num_pages_in_flight * page_pixels * 3 * (output_target.ppi / ppi) ** 2
+
+    def decoded_bytes(path: str) -> int:
+        header = headers.get(path)
+        if header is None:
+            return 0
+
+        return header.width * header.height * Image.getmodebands(header.mode)
+
+    card_pixels = math.floor(card_layout_size.width * ppi_ratio) * math.floor(card_layout_size.height * ppi_ratio)
+    max_sheet_bytes = 0
+    for sheet in selected_sheets:
+        sheet_bytes = 0
+        for file, back_file in zip(sheet.cards, sheet.backs):
+            if file is not None:
+                sheet_bytes = sheet_bytes + decoded_bytes(os.path.join(front_dir_path, file)) + card_pixels * 4
+                if sheet.double_sided:
+                    sheet_bytes = sheet_bytes + decoded_bytes(os.path.join(double_sided_dir_path, back_file)) + card_pixels * 4
+
+        max_sheet_bytes = max(max_sheet_bytes, sheet_bytes)
+
+    print(f'Projected peak memory (rough estimate): {format_bytes(page_bytes + max_sheet_bytes)}')
+
+    # Estimate the render time from the per-stage costs
+    num_card_images = sum(1 for path in image_paths if path != back_card_image_path)
+    if has_single_sided_back:
+        num_card_images = num_card_images + num_back_cards
+
+    # Time the largest card image, which is the most representative of the decode and resize costs
+    decode_cost = DECODE_SECONDS_PER_MEGAPIXEL
+    resize_cost = RESIZE_SECONDS_PER_MEGAPIXEL
+    measured_costs = None
+    if len(headers) > 0:
+        largest_path = max(headers, key=lambda path: headers[path].width * headers[path].height)
+        card_size = (math.floor(card_layout_size.width * ppi_ratio), math.floor(card_layout_size.height * ppi_ratio))
+        measured_costs = measure_card_costs(largest_path, card_size)
+
+    if measured_costs is not None:
+        decode_cost, resize_cost = measured_costs
+
+    # The other stages are not timed, so they are scaled by how fast this machine resized the card
+    machine_factor = resize_cost / RESIZE_SECONDS_PER_MEGAPIXEL
+
+    decode_seconds = sum(header.width * header.height for header in headers.values()) / 1e6 * decode_cost
+    card_seconds = num_card_images * (card_pixels / 1e6 * resize_cost + BLEED_SECONDS_PER_CARD * machine_factor * ppi_ratio ** 2)
+    page_seconds = num_page_images * page_pixels / 1e6 * PAGE_SECONDS_PER_MEGAPIXEL * machine_factor
+
+    save_seconds = 0
+    for output_target in output_targets:
+        target_megapixels = num_pages * page_pixels * (output_target.ppi / ppi) ** 2 / 1e6
+        if output_target.ppi != ppi:
+            save_seconds = save_seconds + num_pages * page_pixels / 1e6 * DOWNSAMPLE_SECONDS_PER_MEGAPIXEL * machine_factor
+
+        if output_target.image_format is None:
+            save_seconds = save_seconds + target_megapixels * PDF_SECONDS_PER_MEGAPIXEL * machine_factor
+        else:
+            save_seconds = save_seconds + target_megapixels * IMAGE_SECONDS_PER_MEGAPIXEL[output_target.image_format] * machine_factor
+
+    measured = 'decode and resize timed on one card, other stages scaled from it' if measured_costs is not None else 'rough, not measured on this machine'
+    print(f'Estimated render time ({measured}): {decode_seconds + card_seconds + page_seconds + save_seconds:.1f}s (decode: {decode_seconds:.1f}s, layout: {card_seconds + page_seconds:.1f}s, save: {save_seconds:.1f}s)')
 
 class OffsetData(BaseModel):
     x_offset: int